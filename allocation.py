@@ -0,0 +1,86 @@
+import pandas as pd
+import numpy as np
+
+COVERAGE_IN_STOCK = 'Em Estoque'
+COVERAGE_PO = 'Importação'
+COVERAGE_NONE = 'Sem Cobertura'
+
+def sorted_rank(values):
+    """Posição de cada valor na ordem alfabética (desempate determinístico, independe da ordem das linhas)."""
+    codes, _ = pd.factorize(pd.Series(values).astype(object), sort=True)
+    return codes
+
+def date_key(values):
+    """Datas como inteiros, com datas vazias ao final."""
+    dates = pd.to_datetime(pd.Series(values), errors='coerce').to_numpy(dtype='datetime64[ns]')
+    keys = dates.view('int64').copy()
+    keys[np.isnat(dates)] = np.iinfo('int64').max
+    return keys
+
+def allocate_supply(df_lines, df_po):
+    """Aloca estoque e POs às linhas em aberto de cada item, por ordem de criação da ordem (FIFO).
+
+    As linhas de um item consomem primeiro o estoque disponível e depois a quantidade das POs,
+    por data de recebimento. Cada linha recebe a própria cobertura (status_cobertura) e, se
+    depender de importação, a data da PO que completa sua quantidade ('Chegada Importação'; vazia
+    para linhas em estoque ou sem cobertura). A previsão de fatura de cada caso está em derived_columns.
+    Vetorizado: soma acumulada da demanda por item + searchsorted na soma acumulada das POs,
+    deslocada pelo total das POs dos itens anteriores.
+    """
+    n = len(df_lines)
+    item_codes, items = pd.factorize(df_lines['itemid'])
+    items = pd.Index(items)
+    if not len(items):
+        df_lines['Chegada Importação'] = np.full(n, np.datetime64('NaT'), dtype='datetime64[ns]')
+        df_lines['status_cobertura'] = np.full(n, COVERAGE_NONE, dtype=object)
+        return df_lines
+
+    demand = pd.to_numeric(df_lines['open_qty_order'], errors='coerce').fillna(0).clip(lower=0).to_numpy(dtype=float)
+    stock = pd.to_numeric(df_lines['stock_available'], errors='coerce').fillna(0).clip(lower=0).to_numpy(dtype=float)
+
+    order = np.lexsort((sorted_rank(df_lines['salesid']), date_key(df_lines['order_date']), item_codes))
+    line_items = item_codes[order]
+    cum_demand = pd.Series(demand[order]).groupby(line_items).cumsum().to_numpy()
+    needed = cum_demand - stock[order]
+
+    df_po = df_po.dropna(subset=['itemid', 'requested_receipt_date'])
+    po_codes = items.get_indexer(df_po['itemid'])
+    known = po_codes >= 0
+    po_codes = po_codes[known]
+    po_dates = pd.to_datetime(df_po['requested_receipt_date'], errors='coerce').to_numpy(dtype='datetime64[ns]')[known]
+    if 'po_qty' in df_po.columns:
+        po_qty = pd.to_numeric(df_po['po_qty'], errors='coerce').fillna(0).clip(lower=0).to_numpy(dtype=float)[known]
+    else:
+        print("Aviso: base de PO sem coluna de quantidade; cada PO cobre toda a demanda do item.")
+        po_qty = np.full(len(po_codes), demand.sum() + 1)
+
+    po_order = np.lexsort((po_dates.view('int64'), po_codes))
+    po_codes, po_dates = po_codes[po_order], po_dates[po_order]
+    po_cum = np.cumsum(po_qty[po_order])
+
+    item_range = np.arange(len(items))
+    item_first = np.searchsorted(po_codes, item_range, side='left')
+    item_end = np.searchsorted(po_codes, item_range, side='right')
+    item_base = np.where(item_first > 0, po_cum[np.maximum(item_first - 1, 0)] if len(po_cum) else 0, 0)
+
+    valid_item = line_items >= 0
+    safe_items = np.where(valid_item, line_items, 0)
+    in_stock = valid_item & (needed <= 0)
+    if len(po_cum):
+        position = np.searchsorted(po_cum, item_base[safe_items] + needed, side='left')
+    else:
+        position = np.zeros(n, dtype=int)
+    from_po = valid_item & ~in_stock & (position < item_end[safe_items])
+
+    arrival_sorted = np.full(n, np.datetime64('NaT'), dtype='datetime64[ns]')
+    arrival_sorted[from_po] = po_dates[position[from_po]]
+    status_sorted = np.select([in_stock, from_po], [COVERAGE_IN_STOCK, COVERAGE_PO], default=COVERAGE_NONE)
+
+    arrival = np.empty(n, dtype='datetime64[ns]')
+    arrival[order] = arrival_sorted
+    status = np.empty(n, dtype=object)
+    status[order] = status_sorted
+
+    df_lines['Chegada Importação'] = arrival
+    df_lines['status_cobertura'] = status
+    return df_lines
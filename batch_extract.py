@@ -0,0 +1,88 @@
+import pandas as pd
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from extracts import extract_file_name, write_extract
+from snapshots import published_file
+
+SNAPSHOT_DIR = "data_transformed"
+SNAPSHOT_FILE = "data_costumer_care.parquet"
+OUTPUT_DIR = "extratos"
+GROUP_COLUMNS = {
+    'customer': 'cust_account_id',
+    'salesperson': 'sales_responsible',
+}
+BATCHES_PER_WORKER = 4
+
+def write_batch(snapshot_path, group_col, keys, output_dir, today):
+    """Lê do snapshot só as linhas do lote e grava um extrato por chave. Executado nos processos do pool."""
+    started = time.perf_counter()
+    df = pd.read_parquet(snapshot_path, filters=[(group_col, 'in', list(keys))])
+
+    files = 0
+    for key, df_group in df.groupby(group_col, observed=True, sort=False):
+        df_group = df_group.sort_values('order_date', kind='stable')
+        write_extract(df_group, os.path.join(output_dir, extract_file_name(key, today)), constant_memory=True, today=today)
+        files += 1
+
+    return {
+        'pid': os.getpid(),
+        'files': files,
+        'rows': len(df),
+        'seconds': time.perf_counter() - started,
+    }
+
+def run_batch(by='customer', snapshot_path=None, output_dir=OUTPUT_DIR, workers=None):
+    """Gera um extrato Excel por cliente (ou vendedor) a partir do snapshot, dividindo as chaves entre processos.
+
+    Sem `snapshot_path`, usa a versão publicada mais recente (manifest.json).
+    """
+    snapshot_path = snapshot_path or published_file(SNAPSHOT_DIR, SNAPSHOT_FILE)
+    group_col = GROUP_COLUMNS[by]
+    workers = workers or os.cpu_count() or 1
+    today = datetime.now()
+
+    keys = pd.read_parquet(snapshot_path, columns=[group_col])[group_col].dropna().astype(str).unique().tolist()
+    if not keys:
+        print("Aviso: nenhuma linha no snapshot para gerar extratos.")
+        return []
+
+    os.makedirs(output_dir, exist_ok=True)
+    batch_count = min(len(keys), workers * BATCHES_PER_WORKER)
+    batches = [keys[i::batch_count] for i in range(batch_count)]
+
+    print("-" * 50)
+    print(f"Gerando {len(keys)} extrato(s) por {by} em '{output_dir}' com {workers} processo(s)...")
+    started = time.perf_counter()
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(write_batch, snapshot_path, group_col, batch, output_dir, today) for batch in batches]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results.append(result)
+            print(f"[{done}/{len(batches)}] processo {result['pid']}: {result['files']} extrato(s), "
+                  f"{result['rows']:,} linhas em {result['seconds']:.2f}s")
+
+    print("Resumo por processo:")
+    for pid in sorted({r['pid'] for r in results}):
+        worker_results = [r for r in results if r['pid'] == pid]
+        print(f"  processo {pid}: {sum(r['files'] for r in worker_results)} extrato(s), "
+              f"{sum(r['rows'] for r in worker_results):,} linhas, {sum(r['seconds'] for r in worker_results):.2f}s")
+
+    print(f"Extratos concluídos em {time.perf_counter() - started:.2f}s.")
+    print("-" * 50)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera extratos de linhas em aberto em lote (um arquivo por cliente ou vendedor).")
+    parser.add_argument('--by', choices=sorted(GROUP_COLUMNS), default='customer')
+    parser.add_argument('--snapshot', default=None, help="padrão: versão publicada mais recente")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    run_batch(by=args.by, snapshot_path=args.snapshot, output_dir=args.output_dir, workers=args.workers)
@@ -0,0 +1,230 @@
+import pandas as pd
+import numpy as np
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import transform_data as td
+from allocation import allocate_supply
+from customer_index import build_customer_index, select_customer
+from derived_columns import apply_derived_columns
+from ingest import CACHE_DIR_NAME, read_raw_files
+from profiling import max_rss_mb
+from synthetic_data import EXCEL_MAX_ROWS, generate_sources, write_workbooks
+
+WORK_DIR = "benchmark_work"
+RESULTS_DIR = "benchmark_results"
+FILTER_QUERIES = 200
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "costumer_service.py")
+COLD_START_BUDGET_SECONDS = 3.0
+# roda em um processo novo: import do Streamlit + primeira execução da página, depois uma segunda sessão
+COLD_START_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+app = AppTest.from_file(sys.argv[1], default_timeout=300).run()
+first = time.perf_counter()
+AppTest.from_file(sys.argv[1], default_timeout=300).run()
+second = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - started,
+    'first_render_seconds': first - imported,
+    'warm_render_seconds': second - first,
+    'errors': [str(e.value) for e in app.exception] + [str(e.value) for e in app.error],
+}))
+"""
+
+def measure(stages, name, fn, *args, rows_in=None, trace_memory=True, **kwargs):
+    """Executa uma etapa medindo tempo, pico de memória alocada (tracemalloc) e pico de RSS do processo.
+
+    Com trace_memory=False o tracemalloc fica desligado (ex.: leitura, que roda em outros processos
+    e ficaria várias vezes mais lenta com o rastreamento herdado no fork).
+    """
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    seconds = time.perf_counter() - started
+    peak = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    rows_out = len(result) if isinstance(result, pd.DataFrame) else None
+    stages.append({
+        'stage': name,
+        'seconds': round(seconds, 4),
+        'peak_alloc_mb': round(peak / 2**20, 2) if peak is not None else None,
+        'max_rss_mb': max_rss_mb(),
+        'rows_in': rows_in,
+        'rows_out': rows_out,
+    })
+    peak_text = f"{peak / 2**20:>9.1f} MB" if peak is not None else f"{'-':>9}   "
+    print(f"  {name:<22} {seconds:>9.3f}s  pico {peak_text}  linhas {rows_in} -> {rows_out}")
+    return result
+
+def run_filter_queries(index, queries, seed):
+    """Simula o caminho do dashboard: cliente aleatório + período aleatório, com fatia e soma do valor."""
+    rng = np.random.default_rng(seed)
+    customers = index['customers']
+    if not customers:
+        return 0
+    min_date, max_date = pd.Timestamp(index['min_date']), pd.Timestamp(index['max_date'])
+    span = max((max_date - min_date).days, 1)
+
+    rows = 0
+    for _ in range(queries):
+        customer = customers[rng.integers(0, len(customers))]
+        start = (min_date + pd.Timedelta(days=int(rng.integers(0, span)))).date()
+        end = (pd.Timestamp(start) + pd.Timedelta(days=int(rng.integers(30, 365)))).date()
+        df_slice = select_customer(index, customer, start, end)
+        df_slice['sales_amount'].sum()
+        rows += len(df_slice)
+    return rows
+
+def measure_cold_start(stages, work_dir, budget_seconds=COLD_START_BUDGET_SECONDS):
+    """Mede a abertura do dashboard sobre o snapshot de `work_dir` em um processo Python novo.
+
+    Cold start = import do Streamlit + primeira execução da página (o que um servidor recém-iniciado
+    paga na primeira sessão); a segunda sessão mostra o custo de quem chega com o snapshot já carregado.
+    Retorna o resumo com o orçamento (None se o Streamlit não estiver disponível).
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(APP_FILE), os.environ.get('PYTHONPATH')])))
+    result = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT, APP_FILE], cwd=work_dir, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"  Cold start do dashboard não medido: {result.stderr.strip().splitlines()[-1:]}")
+        return None
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    seconds = timings['import_seconds'] + timings['first_render_seconds']
+    for name, value in [('dashboard_cold_start', seconds), ('dashboard_warm_session', timings['warm_render_seconds'])]:
+        stages.append({'stage': name, 'seconds': round(value, 4), 'peak_alloc_mb': None, 'max_rss_mb': None, 'rows_in': None, 'rows_out': None})
+        print(f"  {name:<22} {value:>9.3f}s")
+
+    within_budget = seconds <= budget_seconds and not timings['errors']
+    print(f"  Orçamento de cold start: {seconds:.3f}s de {budget_seconds:.3f}s -> {'OK' if within_budget else 'ACIMA DO ORÇAMENTO'}")
+    for error in timings['errors']:
+        print(f"  Erro na página: {error}")
+    return {
+        'seconds': round(seconds, 4),
+        'import_seconds': round(timings['import_seconds'], 4),
+        'first_render_seconds': round(timings['first_render_seconds'], 4),
+        'budget_seconds': budget_seconds,
+        'within_budget': within_budget,
+        'errors': timings['errors'],
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(lines, seed=42, work_dir=WORK_DIR, read_workbooks=True, filter_queries=FILTER_QUERIES,
+                  cold_start_budget=COLD_START_BUDGET_SECONDS):
+    """Roda o pipeline etapa por etapa sobre dados sintéticos e retorna o relatório (dicionário)."""
+    print("-" * 50)
+    print(f"Benchmark com {lines:,} linhas de venda (seed {seed})...")
+    stages = []
+
+    frames = generate_sources(lines, seed=seed)
+    raw_path = os.path.join(work_dir, "data_raw")
+    output_dir = os.path.join(work_dir, "data_transformed")
+
+    if read_workbooks and all(len(df) <= EXCEL_MAX_ROWS for df in frames.values()):
+        write_workbooks(frames, raw_path)
+        shutil.rmtree(os.path.join(raw_path, CACHE_DIR_NAME), ignore_errors=True)
+        raw = measure(stages, 'read', read_raw_files, raw_path, trace_memory=False)
+        raw = measure(stages, 'read_cached', read_raw_files, raw_path, trace_memory=False)
+    else:
+        print("Leitura das planilhas ignorada (limite do Excel ou --skip-read); usando as bases geradas em memória.")
+        raw = frames
+
+    sources = measure(stages, 'prepare_sources', td.prepare_sources,
+                      raw['sales'], raw['picking'], raw['stock'], raw['customer'], raw['po'], rows_in=len(raw['sales']))
+    df_filtered, df_picking_tracked, df_stock, df_customer, df_po = sources
+
+    df_merged = measure(stages, 'merge_picking', td.merge_picking, df_filtered, df_picking_tracked, rows_in=len(df_filtered))
+    df_merged = measure(stages, 'merge_stock', td.merge_stock, df_merged, df_stock, rows_in=len(df_merged))
+    df_merged = measure(stages, 'merge_customer', td.merge_customer, df_merged, df_customer, rows_in=len(df_merged))
+    df_merged = measure(stages, 'allocation', allocate_supply, df_merged, df_po, rows_in=len(df_merged))
+    df_merged = measure(stages, 'derived_columns', apply_derived_columns, df_merged, rows_in=len(df_merged))
+    df_merged = measure(stages, 'snapshot_types', td.prepare_snapshot_types, df_merged, rows_in=len(df_merged))
+    snapshot_path = measure(stages, 'write', td.write_snapshot, df_merged, output_dir, rows_in=len(df_merged))
+
+    df_loaded = measure(stages, 'dashboard_load', pd.read_parquet, snapshot_path, memory_map=True)
+    index = measure(stages, 'dashboard_index', build_customer_index, df_loaded, rows_in=len(df_loaded))
+    measure(stages, 'dashboard_filter', run_filter_queries, index, filter_queries, seed, rows_in=filter_queries)
+    cold_start = measure_cold_start(stages, work_dir, cold_start_budget)
+
+    return {
+        'benchmark': 'pipeline',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'lines': lines,
+        'seed': seed,
+        'filter_queries': filter_queries,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'stages': stages,
+        'cold_start': cold_start,
+    }
+
+def save_report(report, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(results_dir, f"pipeline_{report['lines']}_{stamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Resultado salvo em '{path}'.")
+    return path
+
+def compare_reports(baseline_path, current_path):
+    """Imprime a variação de tempo e memória por etapa entre dois relatórios JSON."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {s['stage']: s for s in json.load(f)['stages']}
+    with open(current_path, encoding='utf-8') as f:
+        current = json.load(f)['stages']
+
+    print(f"{'etapa':<22} {'tempo base':>11} {'tempo atual':>11} {'razão':>7} {'pico base':>10} {'pico atual':>10}")
+    for stage in current:
+        base = baseline.get(stage['stage'])
+        if base is None:
+            continue
+        ratio = stage['seconds'] / base['seconds'] if base['seconds'] else float('nan')
+        print(f"{stage['stage']:<22} {base['seconds']:>10.3f}s {stage['seconds']:>10.3f}s {ratio:>6.2f}x "
+              f"{base['peak_alloc_mb'] or 0:>9.1f}M {stage['peak_alloc_mb'] or 0:>9.1f}M")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark por etapa do transform_data e do caminho de leitura/filtro do dashboard.")
+    parser.add_argument('--lines', type=int, nargs='+', default=[10000])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--work-dir', default=WORK_DIR)
+    parser.add_argument('--results-dir', default=RESULTS_DIR)
+    parser.add_argument('--skip-read', action='store_true', help="não grava/lê as planilhas .xlsx")
+    parser.add_argument('--cold-start-budget', type=float, default=COLD_START_BUDGET_SECONDS,
+                        help="tempo máximo (s) até a primeira renderização do dashboard em um processo novo")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'ATUAL'), help="compara dois relatórios JSON")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+    else:
+        over_budget = False
+        for lines in args.lines:
+            report = run_benchmark(lines, seed=args.seed, work_dir=args.work_dir, read_workbooks=not args.skip_read,
+                                   cold_start_budget=args.cold_start_budget)
+            save_report(report, args.results_dir)
+            over_budget |= bool(report['cold_start']) and not report['cold_start']['within_budget']
+        sys.exit(1 if over_budget else 0)
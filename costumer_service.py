@@ -1,9 +1,19 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import io
-from datetime import datetime, date
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 from icons import *
-import altair as alt    
+from customer_index import build_customer_index, select_customer
+from portfolio import PAGE_SIZES, PORTFOLIO_COLUMNS, PORTFOLIO_SORT_COLUMNS, page_count, portfolio_customers, portfolio_page, portfolio_summary
+from kpis import KPI_CUSTOMER_FILE, KPI_CUSTOMER_DAY_FILE, KPI_MEASURES, KPI_META_FILE, build_kpi_tables, build_snapshot_meta, line_totals, read_snapshot_meta
+from allocation import COVERAGE_IN_STOCK, COVERAGE_PO, COVERAGE_NONE
+from snapshots import SnapshotWatcher, version_dir
+from store import STORE_FILE, query_customer, query_portfolio, store_index
 
 st.set_page_config(
     layout="wide", 
@@ -11,8 +21,42 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-DATA_PATH = "data_transformed/data_costumer_care.xlsx"
+TRANSFORMED_PATH = "data_transformed"
+DATA_FILE = "data_costumer_care.parquet"
+RUN_REPORT_PATH = "data_transformed/run_report.json"
+# 'parquet': base inteira em memória em cada processo; 'sqlite': consultas por cliente/período no arquivo
+# gerado por `transform_data.py --sqlite` (compartilhado entre processos do dashboard)
+BACKEND = os.environ.get('OPEN_LINES_BACKEND', 'parquet')
 COLUNA_CLIENTE_DISPLAY = 'customer_name'
+COLUNAS_GRADE = {
+    'order_date': 'Data Criação Ordem',
+    'salesid': 'Ordem Venda',
+    'itemid': 'Item ID',
+    'open_qty_order': 'Qtd Aberta',
+    'sales_amount': 'Valor Aberto (R$)',
+    'status_logistica': 'Status',
+    'picking_route': 'Nº Picking',
+    'picking_date': 'Data Criação Picking',
+    'Status Estoque': 'Status Estoque',
+    'Chegada Importação': 'Chegada Importação',
+    'Data prevista para fatura': 'Previsão Fatura',
+    'customer_group': 'Grupo Cliente',
+}
+# valores e datas seguem numéricos na grade; a formatação fica no navegador
+FORMATO_GRADE = {
+    'Valor Aberto (R$)': st.column_config.NumberColumn(format="localized"),
+    'Previsão Fatura': st.column_config.DatetimeColumn(format="DD/MM/YYYY"),
+}
+COLUNAS_GRADE_CARTEIRA = {'customer_name': 'Cliente', **COLUNAS_GRADE}
+DIMENSOES_CARTEIRA = {'sales_responsible': 'Vendedor', 'customer_group': 'Grupo de cliente'}
+RESUMO_MAX_CLIENTES = 100
+VISAO_CLIENTE = 'Cliente'
+VISAO_CARTEIRA = 'Carteira'
+STATUS_ESTOQUE_ICONES = {
+    COVERAGE_IN_STOCK: '🟩 Em Estoque',
+    COVERAGE_PO: '🟨 Importação',
+    COVERAGE_NONE: '🟥 Sem Cobertura',
+}
 
 def create_kpi_card(icon, title, value):
     """Gera o HTML/CSS para um card de métrica estilizado (Dark Mode)."""
@@ -53,89 +97,323 @@ def create_kpi_card(icon, title, value):
     return html_content
 
 
-@st.cache_data(ttl=600)
 def load_data(path):
-    """Carrega o DataFrame final transformado."""
+    """Carrega o snapshot Parquet transformado (tipos já gravados no arquivo). Levanta ValueError se estiver inutilizável."""
+    full_path = os.path.abspath(path)
+    print(f"DEBUG: Tentando ler em: {full_path}")
+
+    df = pd.read_parquet(path, memory_map=True)
+
+    if df.empty:
+        raise ValueError(f"Arquivo encontrado em '{path}', mas está vazio (0 linhas).")
+
+    if COLUNA_CLIENTE_DISPLAY not in df.columns:
+        raise ValueError(f"A coluna de filtro '{COLUNA_CLIENTE_DISPLAY}' não foi encontrada no arquivo. Colunas disponíveis: {df.columns.tolist()}")
+
+    return df
+
+def snapshot_version(path):
+    """Identifica o conteúdo do snapshot pelo mtime e tamanho do arquivo."""
     try:
-        import os
-        full_path = os.path.abspath(path)
-        print(f"DEBUG: Tentando ler em: {full_path}")
-        
-        df = pd.read_excel(path)
-        
-        if df.empty:
-            st.error(f"Erro de Leitura: Arquivo encontrado em '{path}', mas está vazio (0 linhas).")
-            return pd.DataFrame()
-            
-        for col in ['order_date', 'picking_date', 'Data prevista para fatura']:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors='coerce', format='mixed') 
-    
-        if 'cust_account_id' in df.columns:
-             df['cust_account_id'] = df['cust_account_id'].astype(str).str.strip().str.upper()
-        
-        if 'sales_amount' in df.columns:
-             df['sales_amount'] = pd.to_numeric(df['sales_amount'], errors='coerce').fillna(0)
-             
-        if 'salesid' in df.columns:
-             df['salesid'] = df['salesid'].astype(str).str.strip()
-        
-        if COLUNA_CLIENTE_DISPLAY not in df.columns:
-             st.error(f"Erro de Coluna: A coluna de filtro '{COLUNA_CLIENTE_DISPLAY}' não foi encontrada no arquivo. Colunas disponíveis: {df.columns.tolist()}")
-             return pd.DataFrame()
-        
-        df[COLUNA_CLIENTE_DISPLAY] = df[COLUNA_CLIENTE_DISPLAY].astype(str).str.strip()
-        
-        return df
-    
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+def load_customer_index(path):
+    """Monta o índice cliente/data usado pelos filtros da barra lateral."""
+    inicio = time.perf_counter()
+    df_loaded = load_data(path)
+    tempo_leitura = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    indice = build_customer_index(df_loaded, customer_col=COLUNA_CLIENTE_DISPLAY)
+    indice['load_seconds'] = tempo_leitura
+    indice['index_seconds'] = time.perf_counter() - inicio
+    return indice
+
+def load_store_index(path):
+    """Lista de clientes e intervalo de datas lidos do SQLite (a base fica no arquivo, não na memória)."""
+    inicio = time.perf_counter()
+    indice = store_index(path, customer_col=COLUNA_CLIENTE_DISPLAY)
+    indice['store_path'] = path
+    indice['load_seconds'] = 0.0
+    indice['index_seconds'] = time.perf_counter() - inicio
+    return indice
+
+def load_lines(pasta, versao):
+    """Índice das linhas (ou resumo do SQLite) de uma versão. Levanta a exceção da leitura se a base estiver inutilizável."""
+    if BACKEND == 'sqlite':
+        indice = load_store_index(os.path.join(pasta, STORE_FILE))
+    else:
+        indice = load_customer_index(os.path.join(pasta, DATA_FILE))
+    indice['version'] = versao
+    return indice
+
+def load_error_message(e):
+    if isinstance(e, FileNotFoundError):
+        return f"Erro de Arquivo: O arquivo {e.filename} não foi encontrado. Execute o script transform_data.py primeiro."
+    return f"Erro de Leitura: {e}"
+
+def load_kpi_tables(pasta, linhas):
+    """Carrega as tabelas de KPI por cliente e por cliente/dia geradas pelo transform_data.
+
+    Sem os arquivos (versões antigas), agrega a partir das linhas, esperando o índice de `linhas`.
+    """
+    try:
+        df_kpi_customer = pd.read_parquet(os.path.join(pasta, KPI_CUSTOMER_FILE))
+        df_kpi_customer_day = pd.read_parquet(os.path.join(pasta, KPI_CUSTOMER_DAY_FILE))
     except FileNotFoundError:
-        st.error(f"Erro de Arquivo: O arquivo {path} não foi encontrado. Execute o script transform_v5.py primeiro.")
-        return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Erro de Leitura Inesperado: {e}")
-        return pd.DataFrame()
-
-@st.cache_data
-def convert_df_to_excel(df_to_convert, sheet_name='Extrato_Aberto'):
-    """Cria o arquivo Excel na memória para download."""
+        df_lines = linhas.result().get('df')
+        if df_lines is None or df_lines.empty:
+            return pd.DataFrame(columns=KPI_MEASURES), build_customer_index(pd.DataFrame())
+        df_kpi_customer, df_kpi_customer_day = build_kpi_tables(df_lines)
+
+    df_kpi_customer[COLUNA_CLIENTE_DISPLAY] = df_kpi_customer[COLUNA_CLIENTE_DISPLAY].astype(str)
+    return df_kpi_customer.set_index(COLUNA_CLIENTE_DISPLAY), build_customer_index(df_kpi_customer_day, customer_col=COLUNA_CLIENTE_DISPLAY)
+
+def load_meta(pasta, kpi_clientes, kpi_diario, linhas):
+    """Clientes, carteiras, datas e totais do resumo JSON.
+
+    Sem ele (versões antigas), calcula das tabelas de KPI; os totais saem das linhas quando a base
+    está em memória (espera o índice de `linhas`), senão da tabela por cliente.
+    """
+    meta = read_snapshot_meta(os.path.join(pasta, KPI_META_FILE))
+    if meta is None:
+        if kpi_clientes.empty:
+            return {'customers': [], 'portfolios': {}, 'min_date': None, 'max_date': None, 'customer_count': 0,
+                    **{measure: 0 for measure in KPI_MEASURES}}
+        df_lines = linhas.result().get('df')
+        totals = line_totals(df_lines) if df_lines is not None else None
+        meta = build_snapshot_meta(kpi_clientes.reset_index(), kpi_diario['df'], PORTFOLIO_COLUMNS, totals=totals)
+
+    for col in ['min_date', 'max_date']:
+        meta[col] = date.fromisoformat(meta[col]) if meta[col] else None
+    return meta
+
+def load_snapshot(manifest):
+    """Carrega uma versão publicada. Executado pelo SnapshotWatcher, fora das sessões.
+
+    O resumo e os KPIs (pequenos) são lidos na hora e bastam para abrir a página; o índice das linhas
+    é montado em segundo plano (`linhas`, um Future) e só é esperado quando a sessão precisa das linhas.
+    """
+    pasta = version_dir(TRANSFORMED_PATH, manifest)
+    versao = manifest['version'] if manifest else snapshot_version(os.path.join(pasta, DATA_FILE))
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshot-linhas')
+    linhas = executor.submit(load_lines, pasta, versao)
+    executor.shutdown(wait=False)
+
+    kpi_clientes, kpi_diario = load_kpi_tables(pasta, linhas)
+    meta = load_meta(pasta, kpi_clientes, kpi_diario, linhas)
+    return {
+        'versao': versao,
+        'meta': meta,
+        'opcoes_clientes': ['Selecione um Cliente'] + meta['customers'],
+        'linhas': linhas,
+        'kpi_clientes': kpi_clientes,
+        'kpi_diario': kpi_diario,
+    }
+
+@st.cache_resource
+def get_snapshot_watcher():
+    """Um único observador do manifest por servidor (carga inicial feita uma vez por processo).
+
+    Versões novas só entram no ar com o índice das linhas já montado: se a leitura falhar, `warm`
+    levanta a exceção e o observador mantém a versão anterior (e tenta de novo na próxima verificação).
+    """
+    return SnapshotWatcher(TRANSFORMED_PATH, load_snapshot, warm=lambda snapshot: snapshot['linhas'].result())
+
+def get_lines_index(snapshot):
+    """Índice das linhas da versão; espera a carga em segundo plano se ela ainda não terminou."""
+    linhas = snapshot['linhas']
+    if not linhas.done():
+        with st.spinner("Carregando as linhas em aberto..."):
+            erro = linhas.exception()
+    else:
+        erro = linhas.exception()
+    if erro:
+        st.error(load_error_message(erro))
+        st.stop()
+    return linhas.result()
+
+def select_open_lines(indice, cliente, data_inicial, data_final):
+    """Linhas do cliente no período, pelo backend configurado."""
+    if BACKEND == 'sqlite':
+        return query_customer(indice['store_path'], cliente, data_inicial, data_final, customer_col=COLUNA_CLIENTE_DISPLAY)
+    return select_customer(indice, cliente, data_inicial, data_final)
+
+def load_run_report(path):
+    """Lê o relatório da última execução do transform_data (None se ainda não existir)."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def render_diagnostics(container, snapshot, tempo_filtro):
+    """Painel de diagnóstico: etapas da última transformação e tempos de carga/filtro desta sessão."""
+    with container:
+        relatorio = load_run_report(RUN_REPORT_PATH)
+        if relatorio:
+            st.caption(
+                f"Última transformação: {relatorio.get('finished_at')} · {relatorio.get('status')} · "
+                f"modo {relatorio.get('mode')} · {relatorio.get('total_seconds', 0):.1f}s · "
+                f"RSS máx. {relatorio.get('max_rss_mb', 0):.0f} MB"
+            )
+            etapas = pd.DataFrame(relatorio.get('stages', []))
+            colunas = [col for col in ['stage', 'seconds', 'rows_in', 'rows_out', 'max_rss_mb'] if col in etapas.columns]
+            st.dataframe(etapas[colunas], hide_index=True, use_container_width=True)
+        else:
+            st.caption("Nenhum relatório de execução encontrado.")
+
+        if snapshot['linhas'].done() and snapshot['linhas'].exception() is None:
+            indice = snapshot['linhas'].result()
+            st.caption(f"Versão do snapshot: {snapshot['versao']} · leitura: {indice.get('load_seconds', 0):.2f}s · "
+                       f"índice: {indice.get('index_seconds', 0):.2f}s")
+        else:
+            st.caption(f"Versão do snapshot: {snapshot['versao']} · índice das linhas em carga ou indisponível")
+        if tempo_filtro is not None:
+            st.caption(f"Filtro cliente/período: {tempo_filtro * 1000:.1f} ms")
+
+@st.cache_resource
+def get_extract_cache():
+    """Cache de extratos compartilhado por todas as sessões do servidor."""
+    from extracts import ExtractCache
+    return ExtractCache()
+
+def convert_df_to_excel(df_to_convert):
+    """Cria o arquivo Excel na memória para download (xlsxwriter só é importado aqui)."""
+    from extracts import write_extract
     output = io.BytesIO()
-    
-    short_sheet_name = 'Extrato_Pick' 
-    
-    sheet_name_with_date = f"{short_sheet_name}_{datetime.now().strftime('%Y%m%d')}"
-    
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df_to_convert.to_excel(writer, index=False, sheet_name=sheet_name_with_date)
+    write_extract(df_to_convert, output)
     return output.getvalue()
 
-df = load_data(DATA_PATH)
+def montar_grade(df_linhas, colunas=None):
+    """Projeta as linhas em aberto nas colunas da grade, com os nomes de exibição.
+
+    Nada é formatado linha a linha: valores e datas seguem numéricos (ver FORMATO_GRADE) e só o
+    status de estoque é calculado, de forma vetorizada. A projeção não copia as colunas da base.
+    """
+    colunas = colunas or COLUNAS_GRADE
+    if 'status_cobertura' in df_linhas.columns:
+        status_estoque = df_linhas['status_cobertura'].map(STATUS_ESTOQUE_ICONES)
+    else:
+        status_estoque = np.where(df_linhas['stock_available'] > 0, '🟩 OK', '🟥 Sem Estoque')
+
+    df_grade = df_linhas.assign(**{'Status Estoque': status_estoque})
+    return df_grade[[col for col in colunas if col in df_grade.columns]].rename(columns=colunas)
+
+def render_portfolio(snapshot, dimensao, carteira, data_inicial, data_final):
+    """Visão de carteira (vendedor ou grupo): totais e clientes saem das tabelas de KPI; as linhas são
+    ordenadas e paginadas no servidor, e só a página vai para o navegador. Retorna o tempo de filtro."""
+    inicio_filtro = time.perf_counter()
+    clientes = portfolio_customers(snapshot['kpi_clientes'], dimensao, carteira)
+    df_resumo, totais = portfolio_summary(snapshot['kpi_diario'], clientes, data_inicial, data_final)
+    tempo_filtro = time.perf_counter() - inicio_filtro
+
+    st.markdown(f"## {user_icon} {DIMENSOES_CARTEIRA[dimensao]}: {carteira}", unsafe_allow_html=True)
+
+    if totais['line_count'] == 0:
+        st.success(f"A carteira {carteira} não possui linhas em aberto no período.")
+        return tempo_filtro
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        valor_formatado = f"R$ {totais['total_open']:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        st.markdown(create_kpi_card(icon=money_icon, title="Valor total em aberto", value=valor_formatado), unsafe_allow_html=True)
+    with col2:
+        st.markdown(create_kpi_card(icon=list_icon, title="Total de linhas", value=f"{int(totais['line_count']):,}".replace(",", ".")), unsafe_allow_html=True)
+    with col3:
+        st.markdown(create_kpi_card(icon=sales_icon, title="Total de ordens de venda", value=f"{int(totais['order_count']):,}".replace(",", ".")), unsafe_allow_html=True)
+    with col4:
+        st.markdown(create_kpi_card(icon=company_icon, title="Clientes com linhas abertas", value=f"{totais['customer_count']:,}".replace(",", ".")), unsafe_allow_html=True)
+
+    st.markdown("---")
+    st.subheader("Clientes da carteira")
+    st.dataframe(
+        df_resumo.head(RESUMO_MAX_CLIENTES).rename(columns={
+            'customer_name': 'Cliente', 'total_open': 'Valor Aberto (R$)', 'line_count': 'Linhas', 'order_count': 'Ordens',
+        }),
+        column_config=FORMATO_GRADE,
+        use_container_width=True,
+        hide_index=True
+    )
+    if len(df_resumo) > RESUMO_MAX_CLIENTES:
+        st.caption(f"Mostrando os {RESUMO_MAX_CLIENTES} clientes com maior valor em aberto de {len(df_resumo):,}.")
+
+    st.subheader("Linhas em aberto da carteira")
+    col1, col2, col3 = st.columns(3)
+    ordenar_por = col1.selectbox("Ordenar por:", options=list(PORTFOLIO_SORT_COLUMNS), key='carteira_ordenar_por')
+    crescente = col2.radio("Ordem:", options=['Crescente', 'Decrescente'], horizontal=True, key='carteira_ordem') == 'Crescente'
+    tamanho_pagina = col3.selectbox("Linhas por página:", options=PAGE_SIZES, key='carteira_tamanho_pagina')
+
+    paginas = page_count(int(totais['line_count']), tamanho_pagina)
+    pagina = st.number_input(
+        f"Página (de {paginas}):", min_value=1, max_value=paginas, value=1, step=1,
+        key=f"carteira_pagina_{dimensao}_{carteira}_{tamanho_pagina}_{data_inicial}_{data_final}"
+    )
+
+    indice = get_lines_index(snapshot)
+    inicio_filtro = time.perf_counter()
+    if BACKEND == 'sqlite':
+        df_pagina, total_linhas = query_portfolio(
+            indice['store_path'], dimensao, carteira, data_inicial, data_final,
+            PORTFOLIO_SORT_COLUMNS[ordenar_por], crescente, pagina - 1, tamanho_pagina
+        )
+    else:
+        df_pagina, total_linhas = portfolio_page(
+            indice, clientes, data_inicial, data_final,
+            PORTFOLIO_SORT_COLUMNS[ordenar_por], crescente, pagina - 1, tamanho_pagina
+        )
+    tempo_filtro += time.perf_counter() - inicio_filtro
+
+    st.dataframe(montar_grade(df_pagina, COLUNAS_GRADE_CARTEIRA), column_config=FORMATO_GRADE, use_container_width=True, hide_index=True)
+    primeira = (pagina - 1) * tamanho_pagina + 1
+    st.caption(f"Linhas {primeira:,} a {min(pagina * tamanho_pagina, total_linhas):,} de {total_linhas:,}.".replace(",", "."))
+    return tempo_filtro
+
+watcher = get_snapshot_watcher()
+snapshot = watcher.current
+if snapshot is None:
+    if watcher.last_error:
+        st.error(load_error_message(watcher.last_error))
+    st.error("Não foi possível carregar o snapshot. Consulte o log do servidor.")
+    st.stop()
+meta = snapshot['meta']
+kpi_clientes, kpi_diario = snapshot['kpi_clientes'], snapshot['kpi_diario']
 
 st.markdown(f"## {wallet_icon} Sales Orders - Open Lines", unsafe_allow_html=True)
 st.caption("Visão focada em linhas em aberto, dentro do intervalo de dez/24 à data presente.")
 
-total_registros_carregados = len(df)
-total_clientes_distintos = df[COLUNA_CLIENTE_DISPLAY].nunique()
+total_registros_carregados = meta['line_count']
+total_clientes_distintos = meta['customer_count']
 
-if df.empty: 
+if total_registros_carregados == 0:
+    erro = snapshot['linhas'].exception()
+    if erro:
+        st.error(load_error_message(erro))
     st.error("Nenhum dado válido carregado. Consulte os erros de leitura acima.")
     st.stop()
 
-lista_clientes = sorted(df[COLUNA_CLIENTE_DISPLAY].dropna().unique())
-
-cliente_selecionado = st.sidebar.selectbox(
-    "Selecione o Cliente (Nome):",
-    options=['Selecione um Cliente'] + lista_clientes
-)
-
-date_col = 'order_date'
-df_dates = df[date_col].dropna()
+visao = st.sidebar.radio("Visão:", options=[VISAO_CLIENTE, VISAO_CARTEIRA], horizontal=True)
+cliente_selecionado = None
+carteira = None
 
-if not df_dates.empty:
-    min_date_available = df_dates.min().date()
-    max_date_available = df_dates.max().date()
+if visao == VISAO_CLIENTE:
+    cliente_selecionado = st.sidebar.selectbox(
+        "Selecione o Cliente (Nome):",
+        options=snapshot['opcoes_clientes']
+    )
 else:
-    min_date_available = date.today()
-    max_date_available = date.today()
+    dimensao = st.sidebar.selectbox("Carteira por:", options=list(DIMENSOES_CARTEIRA), format_func=DIMENSOES_CARTEIRA.get)
+    carteira = st.sidebar.selectbox(
+        f"Selecione o {DIMENSOES_CARTEIRA[dimensao]}:",
+        options=['Selecione uma Carteira'] + meta['portfolios'].get(dimensao, [])
+    )
+
+min_date_available = meta['min_date'] or date.today()
+max_date_available = meta['max_date'] or date.today()
 
 st.sidebar.markdown(f"## {calendar_icon} Período (criação da ordem de venda)", unsafe_allow_html=True)
 
@@ -155,33 +433,39 @@ data_final = st.sidebar.date_input(
     key='date_end'
 )
 
-if data_inicial and data_final and data_inicial <= data_final:
-    df = df[
-        (df[date_col].dt.date >= data_inicial) & 
-        (df[date_col].dt.date <= data_final)
-    ].copy()
-else:
-    if data_inicial > data_final:
-        st.error("A Data Inicial não pode ser posterior à Data Final. Por favor, ajuste o período.")
-        st.stop()
+if data_inicial and data_final and data_inicial > data_final:
+    st.error("A Data Inicial não pode ser posterior à Data Final. Por favor, ajuste o período.")
+    st.stop()
 
 st.sidebar.markdown("---")
 st.sidebar.caption(f"{list_icon} Total de registros na base: **{total_registros_carregados:,}**", unsafe_allow_html=True)
 st.sidebar.caption(f"{user_icon} Total de clientes ativos: **{total_clientes_distintos}**", unsafe_allow_html=True)
 
-if cliente_selecionado and cliente_selecionado != 'Selecione um Cliente':
+painel_diagnostico = st.sidebar.expander("Diagnóstico")
+tempo_filtro = None
+
+if visao == VISAO_CARTEIRA:
+    if carteira and carteira != 'Selecione uma Carteira':
+        tempo_filtro = render_portfolio(snapshot, dimensao, carteira, data_inicial, data_final)
+    else:
+        st.info("Por favor, selecione um vendedor ou grupo de clientes na barra lateral.")
+
+elif cliente_selecionado and cliente_selecionado != 'Selecione um Cliente':
     
-    df_aberto_cliente = df[df[COLUNA_CLIENTE_DISPLAY] == cliente_selecionado].copy()
+    inicio_filtro = time.perf_counter()
+    kpi_periodo = select_customer(kpi_diario, cliente_selecionado, data_inicial, data_final)
+    tempo_filtro = time.perf_counter() - inicio_filtro
+    num_linhas = int(kpi_periodo['line_count'].sum())
 
-    if not df_aberto_cliente.empty:
+    if num_linhas > 0:
         
-        total_aberto = df_aberto_cliente['sales_amount'].sum()
-        num_linhas = len(df_aberto_cliente)
-        num_ordens = df_aberto_cliente['salesid'].nunique()
+        total_aberto = kpi_periodo['total_open'].sum()
+        num_ordens = int(kpi_periodo['order_count'].sum())
         
-        vendedor = df_aberto_cliente['sales_responsible'].iloc[0] if 'sales_responsible' in df_aberto_cliente.columns else 'N/A'
-        nome_cliente = df_aberto_cliente['customer_name'].iloc[0] if 'customer_name' in df_aberto_cliente.columns else 'N/A'
-        conta_cliente = df_aberto_cliente['cust_account_id'].iloc[0] if 'cust_account_id' in df_aberto_cliente.columns else 'N/A'
+        cadastro_cliente = kpi_clientes.loc[cliente_selecionado]
+        vendedor = cadastro_cliente.get('sales_responsible', 'N/A')
+        nome_cliente = cliente_selecionado
+        conta_cliente = cadastro_cliente.get('cust_account_id', 'N/A')
 
         st.markdown(f"## {company_icon} {nome_cliente} : {conta_cliente}", unsafe_allow_html=True)
         
@@ -217,40 +501,23 @@ if cliente_selecionado and cliente_selecionado != 'Selecione um Cliente':
 
         st.markdown("---")
         
-        df_display = df_aberto_cliente.copy()
-        
-        df_display['Status Estoque'] = df_display['stock_available'].apply(
-            lambda x: '🟩 OK' if x > 0 else '🟥 Sem Estoque'
-        )
-        
-        df_display['Valor Aberto (R$)'] = df_display['sales_amount'].apply(
-            lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        )
-        
-        df_display['Previsão Fatura'] = df_display['Data prevista para fatura'].dt.strftime('%d/%m/%Y').fillna('N/A')
-
-        COLUNAS_FINAL_DISPLAY = [
-            'order_date', 'salesid', 'itemid', 'open_qty_order', 
-            'Valor Aberto (R$)', 'status_logistica', 'picking_route', 
-            'picking_date', 'Status Estoque', 'Chegada Importação', 'Previsão Fatura', 'customer_group'
-        ]
-        
-        df_display_final = df_display[[col for col in COLUNAS_FINAL_DISPLAY if col in df_display.columns]].copy()
-        
-        df_display_final.columns = [
-            'Data Criação Ordem', 'Ordem Venda', 'Item ID', 'Qtd Aberta', 
-            'Valor Aberto (R$)', 'Status', 'Nº Picking', 
-            'Data Criação Picking', 'Status Estoque', 'Chegada Importação', 'Previsão Fatura', 'Grupo Cliente'
-        ]
+        indice = get_lines_index(snapshot)
+        inicio_filtro = time.perf_counter()
+        df_aberto_cliente = select_open_lines(indice, cliente_selecionado, data_inicial, data_final)
+        tempo_filtro += time.perf_counter() - inicio_filtro
         
         st.dataframe(
-            df_display_final.sort_values(by='Data Criação Ordem', ascending=True), 
+            montar_grade(df_aberto_cliente),
+            column_config=FORMATO_GRADE,
             use_container_width=True, 
             hide_index=True
         )
         
         st.subheader("Gerar extrato para o atendimento")
-        excel_data = convert_df_to_excel(df_aberto_cliente, sheet_name='Extrato_Picking_Ativo')
+        chave_extrato = (indice['version'], conta_cliente, cliente_selecionado, data_inicial, data_final)
+        excel_data = lambda: get_extract_cache().get_or_build(
+            chave_extrato, lambda: convert_df_to_excel(df_aberto_cliente)
+        )
         
         st.download_button(
             label=f"💾 Baixar o extrato de linhas em aberto de {nome_cliente} (Excel)",
@@ -264,3 +531,5 @@ if cliente_selecionado and cliente_selecionado != 'Selecione um Cliente':
 
 else:
     st.info("Por favor, selecione um cliente na barra lateral.")
+
+render_diagnostics(painel_diagnostico, snapshot, tempo_filtro)
@@ -0,0 +1,63 @@
+import pandas as pd
+import numpy as np
+from datetime import timedelta
+
+def build_customer_index(df, customer_col='customer_name', date_col='order_date'):
+    """Ordena a base por cliente e data uma única vez e guarda o intervalo de linhas de cada cliente.
+
+    Retorna um dicionário com a base ordenada ('df'), o array de datas ('dates'),
+    os offsets por cliente ('offsets': nome -> (início, fim)), a lista ordenada de
+    clientes ('customers'), o total de linhas ('rows') e as datas mínima/máxima da base.
+    """
+    if df.empty or customer_col not in df.columns:
+        return {'df': df, 'dates': np.array([], dtype='datetime64[us]'), 'offsets': {}, 'customers': [], 'rows': len(df), 'min_date': None, 'max_date': None}
+
+    df_sorted = df.sort_values([customer_col, date_col], kind='stable', na_position='last').reset_index(drop=True)
+
+    codes, names = pd.factorize(df_sorted[customer_col])
+    dates = df_sorted[date_col].to_numpy()
+
+    offsets = {}
+    if len(codes):
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        stops = np.r_[starts[1:], len(codes)]
+        # código -1 = cliente vazio (sem cadastro): fica na base, mas fora do índice
+        offsets = {str(names[codes[start]]): (int(start), int(stop)) for start, stop in zip(starts, stops) if codes[start] >= 0}
+
+    valid_dates = df_sorted[date_col].dropna()
+    return {
+        'df': df_sorted,
+        'dates': dates,
+        'offsets': offsets,
+        'customers': sorted(offsets),
+        'rows': len(df_sorted),
+        'min_date': valid_dates.min().date() if not valid_dates.empty else None,
+        'max_date': valid_dates.max().date() if not valid_dates.empty else None,
+    }
+
+def customer_bounds(index, customer, start_date, end_date):
+    """Intervalo (início, fim) de posições na base ordenada com as linhas do cliente no período."""
+    start, stop = index['offsets'].get(customer, (0, 0))
+    dates = index['dates'][start:stop]
+
+    first, last = start, stop
+    if start_date:
+        lower = pd.Timestamp(start_date).to_datetime64().astype(dates.dtype)
+        first = start + int(np.searchsorted(dates, lower, side='left'))
+    if end_date:
+        upper = pd.Timestamp(end_date + timedelta(days=1)).to_datetime64().astype(dates.dtype)
+        last = start + int(np.searchsorted(dates, upper, side='left'))
+    return first, last
+
+def select_customer(index, customer, start_date, end_date):
+    """Linhas do cliente com data entre start_date e end_date (inclusive), como fatia sem cópia da base.
+
+    Datas vazias (None) não limitam o intervalo.
+    """
+    first, last = customer_bounds(index, customer, start_date, end_date)
+    return index['df'].iloc[first:last]
+
+def customers_positions(index, customers, start_date, end_date):
+    """Posições (na base ordenada) das linhas de vários clientes no período, sem copiar a base."""
+    ranges = [np.arange(*customer_bounds(index, customer, start_date, end_date)) for customer in customers]
+    return np.concatenate(ranges) if ranges else np.array([], dtype=np.int64)
@@ -0,0 +1,89 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+
+from allocation import COVERAGE_IN_STOCK
+
+# Regras declarativas das colunas derivadas, avaliadas em ordem sobre colunas inteiras.
+# Tipos de regra:
+#   map          -> valor fixo por valor da coluna de origem (np.select); senão copia `default_column`
+#   date_offset  -> data de origem + `days`; se vazia (ou igual a `missing`), usa a data `fallback` do contexto;
+#                   valores presentes mas inválidos ficam vazios (NaT). Com `base_when`, as linhas cujo
+#                   `column` está em `values` partem da data `date` do contexto (quando a coluna existir na base)
+#   date_format  -> data de origem formatada com `format`; se vazia, usa o texto `missing`
+#
+# Previsão de fatura: linhas cobertas por estoque (alocação FIFO) faturam `days` dias após a data da
+# execução; linhas que dependem de PO, `days` dias após a chegada da PO; as demais, no fallback de ~120 dias.
+DERIVED_COLUMN_RULES = [
+    {
+        'column': 'status_logistica',
+        'kind': 'map',
+        'source': 'picking_status',
+        'mapping': {
+            'ACTIVATED': 'Em Picking (ATIVO)',
+            'COMPLETED': 'Picking Concluído',
+        },
+        'default_column': 'sales_status',
+    },
+    {
+        'column': 'Data prevista para fatura',
+        'kind': 'date_offset',
+        'source': 'Chegada Importação',
+        'days': 4,
+        'fallback': 'data_120_dias',
+        'missing': 'Sem Cobertura',
+        'base_when': {'column': 'status_cobertura', 'values': [COVERAGE_IN_STOCK], 'date': 'data_hoje'},
+    },
+    {
+        'column': 'Chegada Importação',
+        'kind': 'date_format',
+        'source': 'Chegada Importação',
+        'format': '%d/%m/%Y',
+        'missing': 'Sem Cobertura',
+    },
+]
+
+def build_context(hoje=None):
+    """Datas de referência usadas pelas regras (ex.: data da execução, 1º dia do mês ~120 dias à frente)."""
+    hoje = hoje or datetime.now()
+    return {
+        'hoje': hoje,
+        'data_hoje': hoje.replace(hour=0, minute=0, second=0, microsecond=0),
+        'data_120_dias': (hoje.replace(day=1) + timedelta(days=120)).replace(day=1),
+    }
+
+def eval_map(df, rule, context):
+    source = df[rule['source']].to_numpy(dtype=object)
+    conditions = [source == key for key in rule['mapping']]
+    choices = list(rule['mapping'].values())
+    default = df[rule['default_column']].to_numpy(dtype=object)
+    return np.select(conditions, choices, default=default)
+
+def eval_date_offset(df, rule, context):
+    raw = df[rule['source']]
+    source = pd.to_datetime(raw, errors='coerce')
+    missing = raw.isna() | (raw.astype(object) == rule.get('missing')).to_numpy()
+    base_when = rule.get('base_when')
+    if base_when and base_when['column'] in df.columns:
+        from_context = df[base_when['column']].isin(base_when['values']).to_numpy()
+        source = source.mask(from_context, pd.Timestamp(context[base_when['date']]))
+        missing = missing & ~from_context
+    return (source + pd.Timedelta(days=rule['days'])).mask(missing, pd.Timestamp(context[rule['fallback']]))
+
+def eval_date_format(df, rule, context):
+    source = pd.to_datetime(df[rule['source']], errors='coerce')
+    return source.dt.strftime(rule['format']).fillna(rule['missing'])
+
+RULE_EVALUATORS = {
+    'map': eval_map,
+    'date_offset': eval_date_offset,
+    'date_format': eval_date_format,
+}
+
+def apply_derived_columns(df, rules=None, context=None):
+    """Calcula as colunas derivadas com operações vetorizadas, na ordem das regras."""
+    rules = DERIVED_COLUMN_RULES if rules is None else rules
+    context = context or build_context()
+    for rule in rules:
+        df[rule['column']] = RULE_EVALUATORS[rule['kind']](df, rule, context)
+    return df
@@ -0,0 +1,85 @@
+import re
+import threading
+import xlsxwriter
+from collections import OrderedDict
+from datetime import datetime
+
+EXTRACT_SHEET_PREFIX = 'Extrato_Pick'
+EXTRACT_CHUNK_ROWS = 10000
+EXTRACT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+def extract_sheet_name(today=None):
+    today = today or datetime.now()
+    return f"{EXTRACT_SHEET_PREFIX}_{today.strftime('%Y%m%d')}"
+
+def extract_file_name(account, today=None):
+    """Nome padrão do extrato: OpenLines_<conta>_<AAAAMMDD>.xlsx (caracteres inválidos viram '_')."""
+    today = today or datetime.now()
+    safe_account = re.sub(r'[^\w.-]+', '_', str(account)).strip('_') or 'SEM_CONTA'
+    return f"OpenLines_{safe_account}_{today.strftime('%Y%m%d')}.xlsx"
+
+def write_extract(df, target, constant_memory=False, today=None):
+    """Grava o extrato de linhas em aberto em `target` (caminho ou BytesIO), linha a linha.
+
+    Escreve direto com xlsxwriter, em ordem de linha, o que permite o modo constant_memory
+    (o to_excel do pandas grava coluna a coluna e perderia dados nesse modo).
+    """
+    options = {'default_date_format': 'yyyy-mm-dd hh:mm:ss', 'remove_timezone': True}
+    if constant_memory:
+        options['constant_memory'] = True
+    else:
+        options['in_memory'] = True
+
+    workbook = xlsxwriter.Workbook(target, options)
+    worksheet = workbook.add_worksheet(extract_sheet_name(today))
+    header_format = workbook.add_format({'bold': True, 'border': 1})
+
+    worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+
+    row = 1
+    for start in range(0, len(df), EXTRACT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + EXTRACT_CHUNK_ROWS].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        for values in chunk.itertuples(index=False, name=None):
+            worksheet.write_row(row, 0, values)
+            row += 1
+
+    workbook.close()
+    return target
+
+class ExtractCache:
+    """Cache LRU dos extratos já gerados, limitado pelo total de bytes guardados.
+
+    As chaves devem identificar o conteúdo, ex.: (versão do snapshot, conta, data inicial, data final).
+    Compartilhado entre sessões, por isso protegido por lock; a geração roda fora do lock.
+    """
+
+    def __init__(self, max_bytes=EXTRACT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+
+        data = build()
+
+        if len(data) > self.max_bytes:
+            return data
+
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = data
+                self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+        return data
+
+    @property
+    def size(self):
+        return self._size
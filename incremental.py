@@ -0,0 +1,72 @@
+import pandas as pd
+import os
+
+from ingest import to_columnar
+
+STATE_DIR_NAME = "incremental_state"
+BASE_FILE = "base.parquet"
+SALES_KEYS = ['salesid', 'itemid']
+
+# fonte -> colunas-chave usadas para comparar a execução atual com a anterior
+FINGERPRINT_KEYS = {
+    'sales': SALES_KEYS,
+    'picking': SALES_KEYS,
+    'stock': ['itemid'],
+    'customer': ['cust_account_id'],
+    'po': ['itemid'],
+}
+
+def fingerprint(df, keys):
+    """Uma linha por chave com a soma dos hashes das suas linhas (independe da ordem das linhas)."""
+    if df.empty or any(key not in df.columns for key in keys):
+        return pd.DataFrame({col: pd.Series(dtype='object') for col in keys + ['fp_lo', 'fp_hi']})
+
+    hashes = pd.util.hash_pandas_object(df[sorted(df.columns, key=str)], index=False).to_numpy()
+
+    fp = df[keys].copy()
+    # soma em duas metades de 32 bits para não estourar o uint64
+    fp['fp_lo'] = (hashes & 0xFFFFFFFF).astype('int64')
+    fp['fp_hi'] = (hashes >> 32).astype('int64')
+    return fp.groupby(keys, as_index=False, dropna=False, observed=True)[['fp_lo', 'fp_hi']].sum()
+
+def compute_fingerprints(frames):
+    """Impressões digitais por chave de cada fonte já preparada (dicionário nome -> DataFrame)."""
+    return {name: fingerprint(frames[name], keys) for name, keys in FINGERPRINT_KEYS.items()}
+
+def changed_keys(previous, current, keys):
+    """Chaves novas, removidas ou com conteúdo diferente entre duas execuções."""
+    both = previous.merge(current, on=keys, how='outer', suffixes=('_prev', '_cur'), indicator=True)
+    diff = (
+        (both['_merge'] != 'both')
+        | (both['fp_lo_prev'] != both['fp_lo_cur'])
+        | (both['fp_hi_prev'] != both['fp_hi_cur'])
+    )
+    return both.loc[diff, keys].reset_index(drop=True)
+
+def key_mask(df, keys_df, keys):
+    """Máscara booleana das linhas de `df` cujas chaves aparecem em `keys_df`."""
+    if keys_df.empty:
+        return pd.Series(False, index=df.index)
+    if len(keys) == 1:
+        return df[keys[0]].isin(keys_df[keys[0]])
+    rows = pd.MultiIndex.from_frame(df[keys].astype(str))
+    wanted = pd.MultiIndex.from_frame(keys_df[keys].astype(str))
+    return pd.Series(rows.isin(wanted), index=df.index)
+
+def load_state(state_dir):
+    """Carrega a base mesclada e as impressões digitais da execução anterior, ou None se não existirem."""
+    base_path = os.path.join(state_dir, BASE_FILE)
+    fp_paths = {name: os.path.join(state_dir, f"fp_{name}.parquet") for name in FINGERPRINT_KEYS}
+    if not os.path.exists(base_path) or not all(os.path.exists(p) for p in fp_paths.values()):
+        return None
+
+    df_base = pd.read_parquet(base_path)
+    fingerprints = {name: pd.read_parquet(path) for name, path in fp_paths.items()}
+    return df_base, fingerprints
+
+def save_state(state_dir, df_base, fingerprints):
+    """Grava a base mesclada (antes das colunas derivadas) e as impressões digitais desta execução."""
+    os.makedirs(state_dir, exist_ok=True)
+    to_columnar(df_base.copy()).to_parquet(os.path.join(state_dir, BASE_FILE), index=False)
+    for name, fp in fingerprints.items():
+        to_columnar(fp.copy()).to_parquet(os.path.join(state_dir, f"fp_{name}.parquet"), index=False)
@@ -0,0 +1,112 @@
+import pandas as pd
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from schemas import SCHEMAS, read_with_schema, schema_fingerprint, stream_with_schema
+
+RAW_FILES = {name: schema['file'] for name, schema in SCHEMAS.items()}
+CACHE_DIR_NAME = ".ingest_cache"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def content_hash(path):
+    """Calcula o SHA-256 do conteúdo do arquivo, lendo em blocos."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_paths(cache_dir, path):
+    """Retorna os caminhos (parquet, metadados) do cache de um arquivo bruto."""
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    base = os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(path))[0]}_{key}")
+    return base + ".parquet", base + ".json"
+
+def to_columnar(df):
+    """Converte colunas object com tipos mistos (comum nos exports do ERP) para texto, mantendo os nulos."""
+    for col in [col for col in df.columns if df[col].dtype == object]:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    df.columns = [str(col) for col in df.columns]
+    return df
+
+def cached_copy(name, path, cache_dir):
+    """Retorna o parquet em cache se o arquivo e o esquema não mudaram (caminho, tamanho, mtime ou hash do conteúdo)."""
+    parquet_path, meta_path = cache_paths(cache_dir, path)
+    if not (os.path.exists(parquet_path) and os.path.exists(meta_path)):
+        return None
+
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+
+    stat = os.stat(path)
+    if meta.get('path') != os.path.abspath(path) or meta.get('schema') != schema_fingerprint(name):
+        return None
+    if meta.get('size') == stat.st_size and meta.get('mtime') == stat.st_mtime:
+        return parquet_path
+
+    # mtime mudou (ex.: arquivo copiado de novo), mas o conteúdo pode ser o mesmo
+    if meta.get('size') == stat.st_size and meta.get('sha256') == content_hash(path):
+        meta['mtime'] = stat.st_mtime
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        return parquet_path
+
+    return None
+
+def parse_to_cache(name, path, cache_dir):
+    """Lê a planilha conforme o esquema e grava a cópia colunar no cache. Executado nos processos do pool."""
+    parquet_path, meta_path = cache_paths(cache_dir, path)
+    stat = os.stat(path)
+    sha256 = content_hash(path)
+
+    reader = stream_with_schema if 'row_filter' in SCHEMAS[name] else read_with_schema
+    df = to_columnar(reader(name, path))
+    df.to_parquet(parquet_path, index=False)
+
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump({'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': sha256,
+                   'schema': schema_fingerprint(name)}, f)
+
+    return parquet_path
+
+def read_raw_files(raw_path, files=None, max_workers=None):
+    """Carrega as planilhas de origem, reaproveitando o cache e lendo em paralelo apenas as que mudaram.
+
+    Cada planilha é lida só com as colunas do seu esquema (schemas.SCHEMAS), já com os nomes internos;
+    vendas e picking chegam já filtrados pelos status ativos/acompanhados.
+    Retorna um dicionário nome -> DataFrame com as mesmas chaves de `files` (padrão: RAW_FILES).
+    """
+    files = files or RAW_FILES
+    cache_dir = os.path.join(raw_path, CACHE_DIR_NAME)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    parquet_by_name = {}
+    pending = {}
+    for name, file_name in files.items():
+        path = os.path.join(raw_path, file_name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(2, "No such file or directory", path)
+
+        cached = cached_copy(name, path, cache_dir)
+        if cached:
+            parquet_by_name[name] = cached
+        else:
+            pending[name] = path
+
+    if pending:
+        print(f"Lendo {len(pending)} planilha(s) alterada(s): {', '.join(os.path.basename(p) for p in pending.values())}")
+    if parquet_by_name:
+        print(f"Reaproveitando cache de {len(parquet_by_name)} planilha(s) sem alteração.")
+
+    if len(pending) == 1:
+        name, path = next(iter(pending.items()))
+        parquet_by_name[name] = parse_to_cache(name, path, cache_dir)
+    elif pending:
+        with ProcessPoolExecutor(max_workers=max_workers or min(len(pending), os.cpu_count() or 1)) as pool:
+            futures = {name: pool.submit(parse_to_cache, name, path, cache_dir) for name, path in pending.items()}
+            for name, future in futures.items():
+                parquet_by_name[name] = future.result()
+
+    return {name: pd.read_parquet(parquet_by_name[name]) for name in files}
@@ -0,0 +1,70 @@
+import json
+
+KPI_CUSTOMER_FILE = "data_costumer_kpis.parquet"
+KPI_CUSTOMER_DAY_FILE = "data_costumer_kpis_daily.parquet"
+KPI_META_FILE = "data_costumer_meta.json"
+KPI_MEASURES = ['total_open', 'line_count', 'order_count']
+
+def aggregate_lines(df, keys):
+    """Valor em aberto, nº de linhas e nº de ordens distintas por grupo de `keys`."""
+    return df.groupby(keys, observed=True, sort=True).agg(
+        total_open=('sales_amount', 'sum'),
+        line_count=('salesid', 'size'),
+        order_count=('salesid', 'nunique'),
+    ).reset_index()
+
+def build_kpi_tables(df):
+    """Gera as tabelas agregadas usadas pelos cards do dashboard.
+
+    Retorna (por cliente, por cliente e data de criação da ordem). A tabela diária atende ao
+    filtro de período do dashboard somando as linhas do intervalo; meses e outros períodos
+    saem dela por soma. O nº de ordens assume que as linhas de uma ordem têm a mesma data.
+    """
+    df_customer = aggregate_lines(df, ['customer_name'])
+
+    attributes = df.groupby('customer_name', observed=True, sort=True)[['cust_account_id', 'sales_responsible', 'customer_group']].first().reset_index()
+    df_customer = df_customer.merge(attributes, on='customer_name', how='left')
+
+    df_dated = df[df['order_date'].notna()].assign(order_date=lambda d: d['order_date'].dt.normalize())
+    df_customer_day = aggregate_lines(df_dated, ['customer_name', 'order_date'])
+
+    return df_customer, df_customer_day
+
+def line_totals(df):
+    """Totais da base inteira, inclusive linhas sem cliente no cadastro (que as tabelas por cliente não têm)."""
+    return {
+        'total_open': float(df['sales_amount'].sum()),
+        'line_count': len(df),
+        'order_count': int(df['salesid'].nunique()),
+    }
+
+def build_snapshot_meta(df_customer, df_customer_day, portfolio_columns=(), totals=None):
+    """Resumo pequeno (JSON) para o dashboard abrir sem ler as linhas: clientes, carteiras, datas e totais.
+
+    `totals` vem de line_totals sobre a base; sem ele, os totais são somados da tabela por cliente.
+    """
+    dates = df_customer_day['order_date'].dropna()
+    totals = totals or {
+        'total_open': float(df_customer['total_open'].sum()),
+        'line_count': int(df_customer['line_count'].sum()),
+        'order_count': int(df_customer['order_count'].sum()),
+    }
+    return {
+        'customers': sorted(df_customer['customer_name'].astype(str)),
+        'portfolios': {
+            col: sorted(df_customer[col].dropna().astype(str).unique())
+            for col in portfolio_columns if col in df_customer.columns
+        },
+        'min_date': dates.min().date().isoformat() if len(dates) else None,
+        'max_date': dates.max().date().isoformat() if len(dates) else None,
+        **totals,
+        'customer_count': len(df_customer),
+    }
+
+def read_snapshot_meta(path):
+    """Resumo gravado pelo transform_data (None em versões anteriores ao arquivo)."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from customer_index import customers_positions
+from kpis import KPI_MEASURES
+
+PORTFOLIO_COLUMNS = ['sales_responsible', 'customer_group']
+PAGE_SIZES = [50, 100, 250, 500]
+# rótulo na tela -> coluna usada na ordenação das linhas da carteira (nos dois backends)
+PORTFOLIO_SORT_COLUMNS = {
+    'Data Criação Ordem': 'order_date',
+    'Valor Aberto (R$)': 'sales_amount',
+    'Cliente': 'customer_name',
+    'Ordem Venda': 'salesid',
+    'Previsão Fatura': 'Data prevista para fatura',
+}
+
+def portfolio_customers(df_kpi_customer, by, value):
+    """Clientes da carteira de um vendedor (ou grupo). `df_kpi_customer` indexada por customer_name."""
+    mask = (df_kpi_customer[by].astype(str) == str(value)).to_numpy()
+    return sorted(df_kpi_customer.index[mask].astype(str))
+
+def portfolio_summary(kpi_daily_index, customers, start_date, end_date):
+    """Totais da carteira no período, somados da tabela diária de KPI (nunca das linhas).
+
+    Retorna (uma linha por cliente, ordenada pelo valor em aberto; dicionário com os totais).
+    """
+    positions = customers_positions(kpi_daily_index, customers, start_date, end_date)
+    df_daily = kpi_daily_index['df'].iloc[positions]
+
+    df_summary = (
+        df_daily.groupby('customer_name', observed=True, sort=False)[KPI_MEASURES].sum()
+        .sort_values('total_open', ascending=False)
+        .reset_index()
+    )
+    totals = {measure: df_summary[measure].sum() for measure in KPI_MEASURES}
+    totals['customer_count'] = len(df_summary)
+    return df_summary, totals
+
+def sort_page(df, positions, sort_col, ascending, page, page_size):
+    """Ordena as linhas da carteira no servidor e devolve só a página pedida (página começa em 0).
+
+    Só a coluna de ordenação é ordenada; a base é copiada apenas nas linhas da página.
+    """
+    keys = df[sort_col].iloc[positions].reset_index(drop=True)
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        # chaves internadas (transform_data.intern_merge_keys) têm categorias na ordem de chegada, não na ordem dos valores
+        keys = keys.cat.reorder_categories(keys.cat.categories.sort_values())
+    order = keys.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+    page_positions = positions[order[page * page_size:(page + 1) * page_size]]
+    return df.iloc[page_positions]
+
+def page_count(rows, page_size):
+    return max(1, int(np.ceil(rows / page_size)))
+
+def portfolio_page(index, customers, start_date, end_date, sort_col, ascending, page, page_size):
+    """Página das linhas em aberto da carteira a partir do índice em memória. Retorna (página, total de linhas)."""
+    positions = customers_positions(index, customers, start_date, end_date)
+    if not len(positions):
+        return index['df'].iloc[0:0], 0
+    return sort_page(index['df'], positions, sort_col, ascending, page, page_size), len(positions)
@@ -0,0 +1,108 @@
+import json
+import os
+import resource
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+def current_rss_mb():
+    """RSS atual do processo (Linux, via /proc); None onde não estiver disponível."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf('SC_PAGE_SIZE') / 2**20, 1)
+    except (OSError, ValueError, IndexError):
+        return None
+
+def max_rss_mb(children=False):
+    """Pico de RSS do processo (ou dos processos filhos já finalizados, ex.: pool de leitura)."""
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+def reset_peak_rss():
+    """Zera o pico de RSS do processo (Linux: '5' em /proc/self/clear_refs). Retorna False onde não for possível."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb():
+    """Pico de RSS desde o último reset_peak_rss (VmHWM em /proc/self/status); None onde não estiver disponível."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+class RunProfiler:
+    """Registra tempo, linhas de entrada/saída e memória de cada etapa de uma execução."""
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self.stages = []
+        self._open_peaks = []
+
+    def _fold_peak(self):
+        """Leva o pico atual às etapas abertas (antes de um novo reset e ao fim de cada etapa)."""
+        peak = peak_rss_mb()
+        if peak is not None:
+            for open_peak in self._open_peaks:
+                open_peak['mb'] = max(open_peak['mb'], peak)
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Mede o bloco como uma etapa. O dicionário retornado aceita 'rows_out' e outros campos.
+
+        No Linux, 'max_rss_mb' é o pico de RSS durante a própria etapa: o pico do processo é zerado
+        no início e lido no fim (VmHWM); em etapas aninhadas, o pico das internas conta para as
+        externas. Em outros sistemas fica o pico do processo desde o início (ru_maxrss), que só cresce.
+        """
+        record = {'stage': name, 'rows_in': rows_in, 'rows_out': None}
+        self._fold_peak()
+        per_stage = reset_peak_rss()
+        open_peak = {'mb': 0.0}
+        self._open_peaks.append(open_peak)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = round(time.perf_counter() - started, 4)
+            record['rss_mb'] = current_rss_mb()
+            self._fold_peak()
+            self._open_peaks.remove(open_peak)
+            record['max_rss_mb'] = open_peak['mb'] if per_stage and open_peak['mb'] else max_rss_mb()
+            record['max_rss_children_mb'] = max_rss_mb(children=True)
+            self.stages.append(record)
+
+    def report(self, **extra):
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'total_seconds': round(time.perf_counter() - self._started, 4),
+            'max_rss_mb': max([max_rss_mb()] + [s['max_rss_mb'] for s in self.stages]),
+            **extra,
+            'stages': self.stages,
+        }
+
+    def write_report(self, path, **extra):
+        """Grava o relatório JSON (arquivo temporário + rename, para o dashboard nunca ler pela metade)."""
+        report = self.report(**extra)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+        return report
+
+    def print_summary(self):
+        print(f"{'Etapa':<20} {'Tempo':>9} {'Linhas entrada':>15} {'Linhas saída':>13} {'RSS máx.':>10}")
+        for s in self.stages:
+            rows_in = f"{s['rows_in']:,}" if s['rows_in'] is not None else '-'
+            rows_out = f"{s['rows_out']:,}" if s['rows_out'] is not None else '-'
+            print(f"{s['stage']:<20} {s['seconds']:>8.2f}s {rows_in:>15} {rows_out:>13} {s['max_rss_mb']:>8.0f}MB")
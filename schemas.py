@@ -0,0 +1,210 @@
+import pandas as pd
+import hashlib
+import json
+from openpyxl import load_workbook
+
+ACTIVE_SALES_STATUSES = ['OPEN ORDER']
+TRACKED_PICKING_STATUSES = ['ACTIVATED', 'COMPLETED']
+STREAM_CHUNK_ROWS = 50000
+
+# Registro das bases de origem: arquivo, colunas usadas pelo pipeline (nome interno -> apelidos
+# aceitos no cabeçalho do ERP, em ordem de prioridade), tipo e obrigatoriedade.
+# O próprio nome interno também é aceito como cabeçalho (com prioridade sobre os apelidos).
+# 'optional_file': se faltar coluna obrigatória, a base é ignorada (vazia) em vez de abortar.
+# 'row_filter': a planilha é lida em streaming e só as linhas com o status listado (e as chaves
+# já limpas) chegam ao pandas; usado nas bases que acumulam histórico fechado.
+SCHEMAS = {
+    'sales': {
+        'file': "CHINTSalesDetail.xlsx",
+        'columns': {
+            'salesid': {'aliases': ['SalesId'], 'dtype': 'str', 'required': True},
+            'itemid': {'aliases': ['Item Id'], 'dtype': 'str', 'required': True},
+            'cust_account_id': {'aliases': ['Cust Account'], 'dtype': 'str', 'required': True},
+            'sales_amount': {'aliases': ['Sales Amount'], 'dtype': 'number', 'required': False},
+            'open_qty_order': {'aliases': ['Open Qty'], 'dtype': 'number', 'required': True},
+            'order_date': {'aliases': ['Create Date'], 'dtype': 'datetime', 'required': True},
+            'sales_status': {'aliases': ['Sales Status', 'Status Venda'], 'dtype': 'str', 'required': True},
+        },
+        'row_filter': {'column': 'sales_status', 'values': ACTIVE_SALES_STATUSES, 'clean': ['salesid', 'itemid', 'cust_account_id']},
+    },
+    'picking': {
+        'file': "SalesPickingList.xlsx",
+        'columns': {
+            'salesid': {'aliases': ['Number'], 'dtype': 'str', 'required': True},
+            'itemid': {'aliases': ['Item number'], 'dtype': 'str', 'required': True},
+            'picking_route': {'aliases': ['Route'], 'dtype': 'str', 'required': True},
+            'picking_status': {'aliases': ['Handling status'], 'dtype': 'str', 'required': True},
+            'picking_date': {'aliases': ['Created date and time'], 'dtype': 'datetime', 'required': True},
+            'picking_qty': {'aliases': ['Quantity'], 'dtype': 'number', 'required': True},
+        },
+        'row_filter': {'column': 'picking_status', 'values': TRACKED_PICKING_STATUSES, 'clean': ['salesid', 'itemid']},
+    },
+    'stock': {
+        'file': "OnHandInventory.xlsx",
+        'columns': {
+            'itemid': {'aliases': ['Item number'], 'dtype': 'str', 'required': True},
+            'stock_available': {'aliases': ['Total available', 'Quantity'], 'dtype': 'number', 'required': False},
+            'coverage_status': {'aliases': [], 'dtype': 'str', 'required': False},
+        },
+    },
+    'customer': {
+        'file': "AllCostumers.xlsx",
+        'columns': {
+            'cust_account_id': {'aliases': ['Account'], 'dtype': 'str', 'required': True},
+            'customer_name': {'aliases': ['Name'], 'dtype': 'str', 'required': True},
+            'customer_group': {'aliases': ['Customer group'], 'dtype': 'str', 'required': True},
+            'sales_responsible': {'aliases': ['Employee responsible'], 'dtype': 'str', 'required': True},
+        },
+    },
+    'po': {
+        'file': "OpenPurchaseOrderLines.xlsx",
+        'optional_file': True,
+        'columns': {
+            'itemid': {'aliases': ['Item number'], 'dtype': 'str', 'required': True},
+            'requested_receipt_date': {'aliases': ['Requested receipt date'], 'dtype': 'datetime', 'required': True},
+            'po_qty': {'aliases': ['Quantity'], 'dtype': 'number', 'required': False},
+        },
+    },
+}
+
+class SchemaError(ValueError):
+    """Falta uma coluna obrigatória no cabeçalho de uma base de origem."""
+
+def schema_fingerprint(name):
+    """Hash do esquema de uma base; entra na chave do cache de leitura."""
+    return hashlib.sha1(json.dumps(SCHEMAS[name], sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+def read_header(path):
+    """Lê apenas a primeira linha da primeira planilha (modo read-only do openpyxl)."""
+    workbook = load_workbook(path, read_only=True)
+    try:
+        first_row = next(workbook.worksheets[0].iter_rows(min_row=1, max_row=1, values_only=True), ())
+    finally:
+        workbook.close()
+    return header_names(first_row)
+
+def header_names(first_row):
+    return [str(value) if value is not None else '' for value in first_row]
+
+def resolve_columns(name, header):
+    """Mapeia cabeçalho do arquivo -> nome interno. Levanta SchemaError se faltar coluna obrigatória."""
+    schema = SCHEMAS[name]
+    available = set(header)
+    resolved = {}
+    missing = []
+    for column, spec in schema['columns'].items():
+        found = next((alias for alias in [column] + spec['aliases'] if alias in available), None)
+        if found is not None:
+            resolved[found] = column
+        elif spec['required']:
+            missing.append(f"{column} ({' / '.join(spec['aliases'])})")
+
+    if missing:
+        raise SchemaError(
+            f"Colunas obrigatórias ausentes em '{schema['file']}': {', '.join(missing)}. "
+            f"Colunas disponíveis: {list(header)}"
+        )
+    return resolved
+
+def empty_frame(name):
+    return pd.DataFrame({column: pd.Series(dtype='object') for column in SCHEMAS[name]['columns']})
+
+def apply_types(name, df):
+    """Converte as colunas numéricas e de data conforme o esquema (valores inválidos viram nulos)."""
+    for column, spec in SCHEMAS[name]['columns'].items():
+        if column not in df.columns:
+            continue
+        if spec['dtype'] == 'number':
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+        elif spec['dtype'] == 'datetime':
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+    return df
+
+def read_with_schema(name, path):
+    """Lê só as colunas do esquema, já com os nomes internos, validando o cabeçalho antes do parsing."""
+    try:
+        resolved = resolve_columns(name, read_header(path))
+    except SchemaError as e:
+        if SCHEMAS[name].get('optional_file'):
+            print(f"Aviso: {e} A base será ignorada.")
+            return empty_frame(name)
+        raise
+
+    text_columns = {header: str for header, column in resolved.items() if SCHEMAS[name]['columns'][column]['dtype'] == 'str'}
+    df = pd.read_excel(path, usecols=list(resolved), dtype=text_columns)
+    return apply_types(name, df.rename(columns=resolved))
+
+def cell_text(value):
+    """Texto da célula como o read_excel(dtype=str) produziria (inteiros gravados como float ficam sem '.0')."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+def rows_to_frame(name, rows, columns):
+    df = pd.DataFrame(rows, columns=columns, dtype=object)
+    for column in columns:
+        if SCHEMAS[name]['columns'][column]['dtype'] == 'str':
+            df[column] = df[column].astype(str)
+    return apply_types(name, df)
+
+def stream_with_schema(name, path, chunk_rows=STREAM_CHUNK_ROWS):
+    """Lê a planilha linha a linha (openpyxl read-only), mantendo só as linhas aceitas por 'row_filter'.
+
+    Status e chaves são normalizados (strip/upper) durante a leitura e as linhas aceitas viram
+    DataFrames a cada `chunk_rows`, então a memória acompanha as linhas em aberto e não o histórico.
+    """
+    row_filter = SCHEMAS[name]['row_filter']
+    allowed = set(row_filter['values'])
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = header_names(next(rows, ()))
+        resolved = resolve_columns(name, header)
+        positions = [header.index(found) for found in resolved]
+        columns = list(resolved.values())
+        text_positions = [i for i, column in enumerate(columns) if SCHEMAS[name]['columns'][column]['dtype'] == 'str']
+        clean_positions = [columns.index(column) for column in row_filter['clean'] if column in columns]
+        filter_position = columns.index(row_filter['column'])
+        filter_cell = positions[filter_position]
+
+        chunks, buffer = [], []
+        for row in rows:
+            status = row[filter_cell] if filter_cell < len(row) else None
+            status = cell_text(status).strip().upper() if status is not None else None
+            if status not in allowed:
+                continue
+
+            values = [row[i] if i < len(row) else None for i in positions]
+            for i in text_positions:
+                values[i] = cell_text(values[i])
+            for i in clean_positions:
+                if values[i] is not None:
+                    values[i] = values[i].strip().upper()
+            values[filter_position] = status
+            buffer.append(values)
+
+            if len(buffer) >= chunk_rows:
+                chunks.append(rows_to_frame(name, buffer, columns))
+                buffer = []
+    finally:
+        workbook.close()
+
+    if buffer or not chunks:
+        chunks.append(rows_to_frame(name, buffer, columns))
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+def apply_schema(name, df):
+    """Aplica o esquema a um DataFrame já em memória (cabeçalhos do ERP ou nomes internos)."""
+    try:
+        resolved = resolve_columns(name, [str(col) for col in df.columns])
+    except SchemaError as e:
+        if SCHEMAS[name].get('optional_file'):
+            print(f"Aviso: {e} A base será ignorada.")
+            return empty_frame(name)
+        raise
+
+    df = df[list(resolved)].rename(columns=resolved)
+    return apply_types(name, df)
@@ -0,0 +1,123 @@
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+SNAPSHOTS_DIR_NAME = "snapshots"
+MANIFEST_FILE = "manifest.json"
+KEEP_VERSIONS = 3
+MANIFEST_POLL_SECONDS = 5
+STAGING_SUFFIX = ".tmp"
+
+def new_version():
+    return datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+
+def staging_dir(output_dir, version):
+    """Pasta onde a versão é gravada antes de ser publicada (invisível para o dashboard)."""
+    path = os.path.join(output_dir, SNAPSHOTS_DIR_NAME, version + STAGING_SUFFIX)
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    return path
+
+def write_json_atomic(path, data):
+    tmp_path = path + STAGING_SUFFIX
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+
+def publish_version(output_dir, version, staging_path, **info):
+    """Publica a versão: renomeia a pasta de preparo e troca o manifest (os.replace nos dois passos).
+
+    Quem lê o manifest sempre encontra uma versão completa; as versões mais antigas que
+    KEEP_VERSIONS são apagadas depois da troca.
+    """
+    snapshots_dir = os.path.join(output_dir, SNAPSHOTS_DIR_NAME)
+    version_dir = os.path.join(snapshots_dir, version)
+    os.replace(staging_path, version_dir)
+
+    write_json_atomic(os.path.join(output_dir, MANIFEST_FILE), {
+        'version': version,
+        'published_at': datetime.now().isoformat(timespec='seconds'),
+        'path': os.path.join(SNAPSHOTS_DIR_NAME, version),
+        'files': sorted(os.listdir(version_dir)),
+        **info,
+    })
+    prune_versions(snapshots_dir, keep=version)
+    return version_dir
+
+def prune_versions(snapshots_dir, keep, max_versions=KEEP_VERSIONS):
+    versions = sorted(name for name in os.listdir(snapshots_dir) if not name.endswith(STAGING_SUFFIX))
+    for name in versions[:-max_versions]:
+        if name != keep:
+            shutil.rmtree(os.path.join(snapshots_dir, name), ignore_errors=True)
+
+def read_manifest(output_dir):
+    """Manifest da versão publicada (None se ainda não houver nenhuma)."""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def version_dir(output_dir, manifest):
+    """Pasta da versão do manifest; sem manifest, a própria `output_dir` (layout anterior às versões)."""
+    return os.path.join(output_dir, manifest['path']) if manifest else output_dir
+
+def published_file(output_dir, file_name):
+    """Caminho de um arquivo na versão publicada mais recente."""
+    return os.path.join(version_dir(output_dir, read_manifest(output_dir)), file_name)
+
+class SnapshotWatcher:
+    """Acompanha o manifest e carrega cada versão nova uma única vez, em uma thread de fundo.
+
+    `load(manifest)` monta o que as sessões usam (base, índice, KPIs...). A troca é uma simples
+    atribuição de `current`: sessões em andamento continuam com a versão que já tinham em mãos
+    e a próxima execução do script já pega a nova. A primeira carga é feita no construtor.
+
+    `warm(loaded)`, se informado, termina a carga do que `load` deixou em segundo plano antes da
+    troca; a primeira versão é publicada sem esperar, para a página abrir o quanto antes.
+    Se `load` ou `warm` levantarem exceção, a versão anterior continua no ar, a exceção fica em
+    `last_error` e a versão é tentada de novo na próxima verificação.
+    """
+
+    def __init__(self, output_dir, load, poll_seconds=MANIFEST_POLL_SECONDS, warm=None):
+        self.output_dir = output_dir
+        self.load = load
+        self.warm = warm
+        self.poll_seconds = poll_seconds
+        self.current = None
+        self.last_error = None
+        self._seen_version = object()
+        self._failed_version = object()
+        self._lock = threading.Lock()
+        self.check()
+        threading.Thread(target=self._watch, name='snapshot-watcher', daemon=True).start()
+
+    def check(self):
+        """Carrega a versão do manifest se ela ainda não foi vista. Retorna True se houve troca."""
+        with self._lock:
+            manifest = read_manifest(self.output_dir)
+            version = manifest['version'] if manifest else None
+            if version == self._seen_version:
+                return False
+            try:
+                loaded = self.load(manifest)
+                if self.warm and self.current is not None:
+                    self.warm(loaded)
+            except Exception as e:
+                if version != self._failed_version:
+                    print(f"Erro ao carregar a versão {version} do snapshot; mantendo a anterior: {e}")
+                self._failed_version = version
+                self.last_error = e
+                return False
+            self._seen_version = version
+            self.current = loaded
+            self.last_error = None
+            return True
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            self.check()
@@ -0,0 +1,166 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from snapshots import MANIFEST_FILE, read_manifest, version_dir
+
+S3_CACHE_DIR = "data_raw_s3"
+S3_PART_SIZE = 8 * 1024 * 1024
+S3_MAX_WORKERS = 8
+ETAG_FILE = ".s3_etags.json"
+
+class LocalSource:
+    """Planilhas de origem em uma pasta local (padrão do transform_data: data_raw)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def fetch(self, files):
+        return self.path
+
+    def __str__(self):
+        return self.path
+
+def split_s3_uri(uri):
+    """'s3://bucket/prefixo' -> ('bucket', 'prefixo')."""
+    bucket, _, prefix = uri[len('s3://'):].partition('/')
+    return bucket, prefix.strip('/')
+
+def s3_key(prefix, *parts):
+    return '/'.join([prefix, *parts]) if prefix else '/'.join(parts)
+
+def s3_client(endpoint_url=None):
+    """Cliente S3; `endpoint_url` (ou AWS_ENDPOINT_URL) aponta para MinIO/moto em testes locais."""
+    try:
+        import boto3
+    except ImportError:
+        raise ImportError("O pacote boto3 é necessário para ler/gravar no S3 (pip install boto3).")
+    return boto3.client('s3', endpoint_url=endpoint_url)
+
+def error_code(error):
+    return str(error.response.get('Error', {}).get('Code'))
+
+class S3Source:
+    """Planilhas de origem em um prefixo S3, espelhadas em uma pasta local.
+
+    Cada objeto é pedido com If-None-Match (ETag da última cópia): sem alteração, o S3 responde 304
+    e a cópia local é reaproveitada. Objetos alterados são baixados em partes (GETs com Range,
+    em paralelo e com If-Match para não misturar versões), e os arquivos são buscados ao mesmo tempo.
+    """
+
+    def __init__(self, uri, local_dir=None, endpoint_url=None, client=None, part_size=S3_PART_SIZE, max_workers=S3_MAX_WORKERS):
+        self.uri = uri
+        self.bucket, self.prefix = split_s3_uri(uri)
+        self.local_dir = local_dir or os.path.join(S3_CACHE_DIR, self.bucket, *filter(None, self.prefix.split('/')))
+        self.client = client or s3_client(endpoint_url)
+        self.part_size = part_size
+        self.max_workers = max_workers
+
+    def __str__(self):
+        return self.uri
+
+    def load_etags(self):
+        try:
+            with open(os.path.join(self.local_dir, ETAG_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_etags(self, etags):
+        path = os.path.join(self.local_dir, ETAG_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(etags, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def fetch(self, files):
+        """Atualiza a cópia local dos arquivos (nome -> arquivo) e retorna a pasta local."""
+        os.makedirs(self.local_dir, exist_ok=True)
+        etags = self.load_etags()
+
+        with ThreadPoolExecutor(max_workers=min(len(files), self.max_workers) or 1) as pool:
+            futures = {
+                file_name: pool.submit(self.fetch_object, file_name, etags.get(file_name))
+                for file_name in files.values()
+            }
+            results = {file_name: future.result() for file_name, future in futures.items()}
+
+        downloaded = [file_name for file_name, (_, changed) in results.items() if changed]
+        etags.update({file_name: info for file_name, (info, _) in results.items()})
+        self.save_etags(etags)
+
+        print(f"S3 {self.uri}: {len(downloaded)} arquivo(s) baixado(s), {len(results) - len(downloaded)} sem alteração (cache local).")
+        return self.local_dir
+
+    def fetch_object(self, file_name, cached):
+        """Baixa o objeto se a ETag mudou. Retorna ({'etag', 'size'}, baixou?)."""
+        from botocore.exceptions import ClientError
+
+        key = s3_key(self.prefix, file_name)
+        path = os.path.join(self.local_dir, file_name)
+        conditions = {'IfNoneMatch': cached['etag']} if cached and os.path.exists(path) else {}
+
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes=0-{self.part_size - 1}", **conditions)
+        except ClientError as e:
+            if error_code(e) in ('304', 'NotModified'):
+                return cached, False
+            if error_code(e) in ('NoSuchKey', '404'):
+                raise FileNotFoundError(2, "No such file or directory", f"s3://{self.bucket}/{key}")
+            if error_code(e) == 'InvalidRange':
+                response = self.client.get_object(Bucket=self.bucket, Key=key)
+            else:
+                raise
+
+        etag = response['ETag']
+        size = int(response['ContentRange'].rsplit('/', 1)[1]) if response.get('ContentRange') else response['ContentLength']
+        tmp_path = path + '.part'
+        with open(tmp_path, 'wb') as f:
+            f.write(response['Body'].read())
+            f.truncate(size)
+
+        ranges = [(start, min(start + self.part_size, size) - 1) for start in range(self.part_size, size, self.part_size)]
+        if ranges:
+            with ThreadPoolExecutor(max_workers=min(len(ranges), self.max_workers)) as pool:
+                for future in [pool.submit(self.fetch_range, key, tmp_path, etag, start, end) for start, end in ranges]:
+                    future.result()
+
+        os.replace(tmp_path, path)
+        return {'etag': etag, 'size': size}, True
+
+    def fetch_range(self, key, tmp_path, etag, start, end):
+        response = self.client.get_object(Bucket=self.bucket, Key=key, Range=f"bytes={start}-{end}", IfMatch=etag)
+        data = response['Body'].read()
+        with open(tmp_path, 'r+b') as f:
+            f.seek(start)
+            f.write(data)
+
+def open_source(location, endpoint_url=None):
+    """Fonte das planilhas: 's3://bucket/prefixo' ou uma pasta local."""
+    if str(location).startswith('s3://'):
+        return S3Source(location, endpoint_url=endpoint_url)
+    return LocalSource(location)
+
+def upload_snapshot(uri, output_dir, endpoint_url=None, client=None):
+    """Envia a versão publicada para o prefixo S3: primeiro os arquivos da versão, por último o manifest.
+
+    Quem segue o manifest no bucket nunca aponta para uma versão incompleta. Arquivos grandes
+    sobem em multipart (TransferConfig).
+    """
+    from boto3.s3.transfer import TransferConfig
+
+    manifest = read_manifest(output_dir)
+    if manifest is None:
+        raise FileNotFoundError(2, "No such file or directory", os.path.join(output_dir, MANIFEST_FILE))
+
+    bucket, prefix = split_s3_uri(uri)
+    client = client or s3_client(endpoint_url)
+    config = TransferConfig(multipart_threshold=S3_PART_SIZE, multipart_chunksize=S3_PART_SIZE, max_concurrency=S3_MAX_WORKERS)
+
+    local_dir = version_dir(output_dir, manifest)
+    remote_dir = s3_key(prefix, *manifest['path'].replace(os.sep, '/').split('/'))
+    for file_name in manifest['files']:
+        client.upload_file(os.path.join(local_dir, file_name), bucket, s3_key(remote_dir, file_name), Config=config)
+    client.upload_file(os.path.join(output_dir, MANIFEST_FILE), bucket, s3_key(prefix, MANIFEST_FILE), Config=config)
+
+    print(f"Versão {manifest['version']} enviada para s3://{bucket}/{remote_dir}.")
+    return manifest['version']
@@ -0,0 +1,147 @@
+import pandas as pd
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import timedelta
+
+STORE_FILE = "data_costumer_care.sqlite"
+STORE_TABLE = "open_lines"
+STORE_META_TABLE = "store_meta"
+STORE_DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+STORE_CHUNK_ROWS = 50000
+# (cliente/vendedor/grupo, data) atendem os filtros do dashboard; os demais servem a consultas entre clientes
+STORE_INDEXES = {
+    'idx_open_lines_customer_date': ['customer_name', 'order_date'],
+    'idx_open_lines_account': ['cust_account_id'],
+    'idx_open_lines_order_date': ['order_date'],
+    'idx_open_lines_item': ['itemid'],
+    'idx_open_lines_salesperson_date': ['sales_responsible', 'order_date'],
+    'idx_open_lines_group_date': ['customer_group', 'order_date'],
+}
+
+def quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def write_store(df, path):
+    """Grava a base em um arquivo SQLite com índices por cliente, conta, data da ordem e item.
+
+    Datas ficam como texto ISO (comparáveis em ordem), e os tipos originais de data/categoria/texto/número
+    vão para a tabela store_meta para a leitura restaurar o mesmo DataFrame do Parquet.
+    O arquivo é montado ao lado e trocado com os.replace, então leitores nunca veem um banco pela metade.
+    """
+    date_columns = [col for col in df.columns if pd.api.types.is_datetime64_any_dtype(df[col])]
+    category_columns = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+    text_columns = [col for col in df.columns if isinstance(df[col].dtype, pd.StringDtype)]
+    numeric_columns = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])]
+
+    df_store = df.astype({col: object for col in category_columns})
+    for col in date_columns:
+        df_store[col] = df_store[col].dt.strftime(STORE_DATE_FORMAT)
+
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    with closing(sqlite3.connect(tmp_path)) as conn:
+        df_store.to_sql(STORE_TABLE, conn, index=False, chunksize=STORE_CHUNK_ROWS)
+        for index_name, columns in STORE_INDEXES.items():
+            if all(col in df_store.columns for col in columns):
+                conn.execute(f"CREATE INDEX {index_name} ON {STORE_TABLE} ({', '.join(quote(col) for col in columns)})")
+        conn.execute(f"CREATE TABLE {STORE_META_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany(f"INSERT INTO {STORE_META_TABLE} VALUES (?, ?)", [
+            ('date_columns', json.dumps(date_columns)),
+            ('category_columns', json.dumps(category_columns)),
+            ('text_columns', json.dumps(text_columns)),
+            ('numeric_columns', json.dumps(numeric_columns)),
+        ])
+        conn.execute("ANALYZE")
+        conn.commit()
+
+    os.replace(tmp_path, path)
+    return path
+
+def connect(path):
+    """Conexão somente leitura (uma por consulta; várias sessões/processos podem ler o mesmo arquivo)."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(2, "No such file or directory", path)
+    return closing(sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True))
+
+def read_meta(conn):
+    return {key: json.loads(value) for key, value in conn.execute(f"SELECT key, value FROM {STORE_META_TABLE}")}
+
+def store_index(path, customer_col='customer_name', date_col='order_date'):
+    """Resumo da base para os filtros do dashboard, no mesmo formato de build_customer_index (sem a base)."""
+    with connect(path) as conn:
+        rows = conn.execute(f"SELECT COUNT(*) FROM {STORE_TABLE}").fetchone()[0]
+        customers = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT {quote(customer_col)} FROM {STORE_TABLE} WHERE {quote(customer_col)} IS NOT NULL ORDER BY 1"
+        )]
+        min_date, max_date = conn.execute(f"SELECT MIN({quote(date_col)}), MAX({quote(date_col)}) FROM {STORE_TABLE}").fetchone()
+
+    return {
+        'rows': rows,
+        'customers': [str(customer) for customer in customers],
+        'min_date': pd.Timestamp(min_date).date() if min_date else None,
+        'max_date': pd.Timestamp(max_date).date() if max_date else None,
+    }
+
+def period_conditions(date_col, start_date, end_date):
+    conditions, params = [], []
+    if start_date:
+        conditions.append(f"{quote(date_col)} >= ?")
+        params.append(pd.Timestamp(start_date).strftime(STORE_DATE_FORMAT))
+    if end_date:
+        conditions.append(f"{quote(date_col)} < ?")
+        params.append(pd.Timestamp(end_date + timedelta(days=1)).strftime(STORE_DATE_FORMAT))
+    return conditions, params
+
+def restore_types(df, meta):
+    for col in meta['date_columns']:
+        df[col] = pd.to_datetime(df[col], format=STORE_DATE_FORMAT)
+    for col in meta['category_columns']:
+        df[col] = df[col].astype('category')
+    for col in meta['text_columns']:
+        df[col] = df[col].astype('str')
+    for col in meta['numeric_columns']:
+        df[col] = pd.to_numeric(df[col])
+    return df
+
+def query_customer(path, customer, start_date, end_date, customer_col='customer_name', date_col='order_date'):
+    """Linhas do cliente com data entre start_date e end_date (inclusive), filtradas no próprio SQLite.
+
+    Mesmo contrato de customer_index.select_customer: datas vazias (None) não limitam o intervalo.
+    """
+    conditions, params = period_conditions(date_col, start_date, end_date)
+    conditions.insert(0, f"{quote(customer_col)} = ?")
+    params.insert(0, customer)
+
+    sql = f"SELECT * FROM {STORE_TABLE} WHERE {' AND '.join(conditions)} ORDER BY {quote(date_col)} IS NULL, {quote(date_col)}, rowid"
+    with connect(path) as conn:
+        meta = read_meta(conn)
+        df = pd.read_sql_query(sql, conn, params=params)
+    return restore_types(df, meta)
+
+def query_portfolio(path, by, value, start_date, end_date, sort_col, ascending, page, page_size,
+                    customer_col='customer_name', date_col='order_date'):
+    """Página das linhas de um vendedor/grupo no período, ordenada e paginada no SQLite (LIMIT/OFFSET).
+
+    Empates na coluna de ordenação seguem cliente, data e ordem do snapshot, como no índice em memória.
+    Retorna (página, total de linhas da carteira no período).
+    """
+    conditions, params = period_conditions(date_col, start_date, end_date)
+    conditions.insert(0, f"{quote(by)} = ?")
+    params.insert(0, str(value))
+    where = ' AND '.join(conditions)
+    direction = 'ASC' if ascending else 'DESC'
+    nulls_last = f"{quote(sort_col)} IS NULL"
+    tie_break = f"{quote(customer_col)}, {quote(date_col)} IS NULL, {quote(date_col)}, rowid"
+
+    with connect(path) as conn:
+        meta = read_meta(conn)
+        total = conn.execute(f"SELECT COUNT(*) FROM {STORE_TABLE} WHERE {where}", params).fetchone()[0]
+        df = pd.read_sql_query(
+            f"SELECT * FROM {STORE_TABLE} WHERE {where} ORDER BY {nulls_last}, {quote(sort_col)} {direction}, {tie_break} LIMIT ? OFFSET ?",
+            conn, params=params + [page_size, page * page_size],
+        )
+    return restore_types(df, meta), total
@@ -0,0 +1,115 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+
+from ingest import RAW_FILES
+
+EXCEL_MAX_ROWS = 1048575
+START_DATE = pd.Timestamp('2024-12-01')
+
+def key_strings(prefix, numbers, width):
+    return prefix + pd.Series(numbers).astype(str).str.zfill(width)
+
+def generate_sources(lines, seed=42, customers=None, items=None, lines_per_order=4,
+                     closed_ratio=0.35, picking_ratio=0.6, duplicate_picking_ratio=0.05,
+                     missing_customer_ratio=0.02, warehouses=1, extra_columns=8):
+    """Gera as cinco bases de origem com os mesmos cabeçalhos dos exports do ERP.
+
+    Inclui linhas fechadas (histórico), picking duplicado para a mesma linha, contas de venda
+    sem cadastro em AllCostumers e colunas extras que o pipeline descarta.
+    Retorna um dicionário com as mesmas chaves de RAW_FILES.
+    """
+    rng = np.random.default_rng(seed)
+    customers = customers or max(50, lines // 200)
+    items = items or max(100, lines // 50)
+    orders = max(1, lines // lines_per_order)
+
+    # ordens: cliente e data de criação compartilhados por todas as linhas da ordem
+    order_of_line = np.sort(rng.integers(0, orders, lines))
+    customer_pool = int(customers * (1 + missing_customer_ratio))
+    order_customer = rng.integers(0, customer_pool, orders)
+    order_date = START_DATE + pd.to_timedelta(rng.integers(0, 700, orders), unit='D')
+
+    status = np.where(rng.random(lines) < closed_ratio,
+                      rng.choice(['Invoiced', 'Canceled', 'Delivered'], lines),
+                      rng.choice(['Open order', 'OPEN ORDER', ' open order '], lines))
+
+    df_sales = pd.DataFrame({
+        'SalesId': key_strings('OV', order_of_line, 8),
+        'Item Id': key_strings('IT', rng.integers(0, items, lines), 6),
+        'Cust Account': key_strings('C', order_customer[order_of_line], 6),
+        'Sales Amount': rng.gamma(2.0, 900.0, lines).round(2),
+        'Open Qty': rng.integers(1, 200, lines),
+        'Create Date': order_date[order_of_line],
+        'Sales Status': status,
+    })
+    for i in range(extra_columns):
+        df_sales[f'ERP Field {i + 1}'] = rng.integers(0, 1000, lines)
+
+    # picking: parte das linhas, com algumas repetidas (mais de um picking por linha)
+    picked = df_sales.sample(frac=picking_ratio, random_state=seed)
+    duplicated = picked.sample(frac=duplicate_picking_ratio, random_state=seed + 1)
+    picked = pd.concat([picked, duplicated], ignore_index=True)
+    picking_rows = len(picked)
+    df_picking = pd.DataFrame({
+        'Number': picked['SalesId'].to_numpy(),
+        'Item number': picked['Item Id'].to_numpy(),
+        'Route': key_strings('RT', np.arange(picking_rows), 8),
+        'Handling status': rng.choice(['Activated', 'Completed', 'Cancelled'], picking_rows, p=[0.45, 0.45, 0.10]),
+        'Created date and time': picked['Create Date'].to_numpy() + pd.to_timedelta(rng.integers(1, 24 * 60, picking_rows), unit='h'),
+        'Quantity': rng.integers(1, 200, picking_rows),
+    })
+
+    item_numbers = np.repeat(np.arange(items), warehouses)
+    df_stock = pd.DataFrame({
+        'Item number': key_strings('IT', item_numbers, 6),
+        'Warehouse': key_strings('WH', np.tile(np.arange(warehouses), items), 2),
+        'Total available': np.where(rng.random(len(item_numbers)) < 0.4, 0, rng.integers(1, 5000, len(item_numbers))),
+    })
+
+    df_customer = pd.DataFrame({
+        'Account': key_strings('C', np.arange(customers), 6),
+        'Name': key_strings('Cliente Sintético ', np.arange(customers), 6),
+        'Customer group': rng.choice(['DISTRIBUIDOR', 'INDUSTRIA', 'REVENDA', 'PAINELISTA'], customers),
+        'Employee responsible': key_strings('Vendedor ', rng.integers(0, max(5, customers // 40), customers), 3),
+    })
+
+    po_rows = int(items * 1.5)
+    df_po = pd.DataFrame({
+        'Purchase order': key_strings('PO', np.arange(po_rows), 8),
+        'Item number': key_strings('IT', rng.integers(0, items, po_rows), 6),
+        'Requested receipt date': pd.Timestamp.now().normalize() + pd.to_timedelta(rng.integers(5, 240, po_rows), unit='D'),
+        'Quantity': rng.integers(10, 5000, po_rows),
+    })
+
+    return {
+        'sales': df_sales,
+        'picking': df_picking,
+        'stock': df_stock,
+        'customer': df_customer,
+        'po': df_po,
+    }
+
+def write_workbooks(frames, raw_path):
+    """Grava as bases geradas como planilhas .xlsx com os nomes esperados pelo transform_data."""
+    too_large = [name for name, df in frames.items() if len(df) > EXCEL_MAX_ROWS]
+    if too_large:
+        raise ValueError(f"As bases {too_large} passam do limite de linhas do Excel ({EXCEL_MAX_ROWS}).")
+
+    os.makedirs(raw_path, exist_ok=True)
+    for name, df in frames.items():
+        path = os.path.join(raw_path, RAW_FILES[name])
+        with pd.ExcelWriter(path, engine='xlsxwriter') as writer:
+            df.to_excel(writer, index=False)
+        print(f"{RAW_FILES[name]}: {len(df):,} linhas")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera planilhas sintéticas no formato dos exports do ERP.")
+    parser.add_argument('--lines', type=int, default=10000, help="linhas em CHINTSalesDetail (10k a 5M)")
+    parser.add_argument('--output', default="data_raw_synthetic")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--warehouses', type=int, default=1)
+    args = parser.parse_args()
+
+    write_workbooks(generate_sources(args.lines, seed=args.seed, warehouses=args.warehouses), args.output)
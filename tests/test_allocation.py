@@ -0,0 +1,116 @@
+import pandas as pd
+import numpy as np
+import pytest
+
+from allocation import COVERAGE_IN_STOCK, COVERAGE_NONE, COVERAGE_PO, allocate_supply
+
+def reference_allocation(df_lines, df_po):
+    """FIFO linha a linha: estoque primeiro, depois as POs do item por data de recebimento."""
+    df_po = df_po.dropna(subset=['itemid', 'requested_receipt_date'])
+    status, arrival = {}, {}
+    for idx in df_lines.index[df_lines['itemid'].isna()]:
+        status[idx], arrival[idx] = COVERAGE_NONE, pd.NaT
+
+    for item, lines in df_lines.dropna(subset=['itemid']).groupby('itemid', sort=False):
+        stock = max(float(lines['stock_available'].fillna(0).iloc[0]), 0)
+        lines = lines.assign(rank=lines['salesid'].astype(str)).sort_values(['order_date', 'rank'], kind='stable', na_position='last')
+        pos = df_po[df_po['itemid'] == item].sort_values('requested_receipt_date', kind='stable')
+        if 'po_qty' in pos.columns:
+            po_qty = list(pos['po_qty'].fillna(0).clip(lower=0))
+        else:
+            po_qty = [float('inf')] * len(pos)
+
+        cumulative = 0
+        for idx, qty in zip(lines.index, lines['open_qty_order'].fillna(0)):
+            cumulative += max(qty, 0)
+            needed = cumulative - stock
+            if needed <= 0:
+                status[idx], arrival[idx] = COVERAGE_IN_STOCK, pd.NaT
+                continue
+            status[idx], arrival[idx] = COVERAGE_NONE, pd.NaT
+            received = 0
+            for qty_po, date in zip(po_qty, pos['requested_receipt_date']):
+                received += qty_po
+                if received >= needed:
+                    status[idx], arrival[idx] = COVERAGE_PO, date
+                    break
+    return pd.Series(status).reindex(df_lines.index), pd.to_datetime(pd.Series(arrival).reindex(df_lines.index)).astype('datetime64[ns]')
+
+def lines(rows):
+    return pd.DataFrame(rows, columns=['salesid', 'itemid', 'order_date', 'open_qty_order', 'stock_available']).assign(
+        order_date=lambda df: pd.to_datetime(df['order_date'])
+    )
+
+def pos(rows, with_qty=True):
+    df = pd.DataFrame(rows, columns=['itemid', 'requested_receipt_date', 'po_qty']).assign(
+        requested_receipt_date=lambda df: pd.to_datetime(df['requested_receipt_date'])
+    )
+    return df if with_qty else df.drop(columns='po_qty')
+
+def check(df_lines, df_po):
+    expected_status, expected_arrival = reference_allocation(df_lines, df_po)
+    result = allocate_supply(df_lines.copy(), df_po)
+    assert result['status_cobertura'].tolist() == expected_status.tolist()
+    pd.testing.assert_series_equal(result['Chegada Importação'], expected_arrival, check_names=False)
+    return result
+
+def test_stock_covers_every_line():
+    result = check(lines([('S1', 'A', '2025-01-01', 2, 5), ('S2', 'A', '2025-01-02', 3, 5)]), pos([]))
+    assert (result['status_cobertura'] == COVERAGE_IN_STOCK).all()
+
+def test_partial_stock_then_po():
+    df_lines = lines([('S1', 'A', '2025-01-01', 4, 5), ('S2', 'A', '2025-01-02', 4, 5), ('S3', 'A', '2025-01-03', 4, 5)])
+    df_po = pos([('A', '2025-03-01', 4), ('A', '2025-02-01', 4)])
+    result = check(df_lines, df_po)
+    assert result['status_cobertura'].tolist() == [COVERAGE_IN_STOCK, COVERAGE_PO, COVERAGE_PO]
+    assert result['Chegada Importação'].tolist()[1:] == [pd.Timestamp('2025-02-01'), pd.Timestamp('2025-03-01')]
+
+def test_pos_exhausted():
+    df_lines = lines([('S1', 'A', '2025-01-01', 3, 0), ('S2', 'A', '2025-01-02', 3, 0)])
+    result = check(df_lines, pos([('A', '2025-02-01', 4)]))
+    assert result['status_cobertura'].tolist() == [COVERAGE_PO, COVERAGE_NONE]
+
+def test_order_date_ties_break_on_salesid():
+    df_lines = lines([('S2', 'A', '2025-01-01', 3, 3), ('S1', 'A', '2025-01-01', 3, 3), ('S0', 'A', None, 3, 3)])
+    result = check(df_lines, pos([('A', '2025-02-01', 3)]))
+    assert result['status_cobertura'].tolist() == [COVERAGE_PO, COVERAGE_IN_STOCK, COVERAGE_NONE]
+
+def test_pos_for_unknown_items_are_ignored():
+    df_lines = lines([('S1', 'A', '2025-01-01', 3, 0), ('S2', 'B', '2025-01-01', 3, 0)])
+    df_po = pos([('Z', '2025-01-15', 100), ('B', '2025-02-01', 3), ('A', None, 10)])
+    result = check(df_lines, df_po)
+    assert result['status_cobertura'].tolist() == [COVERAGE_NONE, COVERAGE_PO]
+
+def test_missing_po_qty_covers_whole_demand():
+    df_lines = lines([('S1', 'A', '2025-01-01', 30, 0), ('S2', 'A', '2025-01-02', 30, 0), ('S3', 'B', '2025-01-01', 1, 0)])
+    df_po = pos([('A', '2025-03-01', 0), ('A', '2025-02-01', 0)], with_qty=False)
+    result = check(df_lines, df_po)
+    assert result['Chegada Importação'].tolist()[:2] == [pd.Timestamp('2025-02-01')] * 2
+    assert result['status_cobertura'].iloc[2] == COVERAGE_NONE
+
+def test_lines_without_item():
+    df_lines = lines([('S1', None, '2025-01-01', 3, 5), ('S2', None, '2025-01-02', 3, 5)])
+    result = check(df_lines, pos([('A', '2025-02-01', 10)]))
+    assert (result['status_cobertura'] == COVERAGE_NONE).all()
+    assert result['Chegada Importação'].isna().all()
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_reference_on_random_lines(seed):
+    rng = np.random.default_rng(seed)
+    n, items = 400, np.array(['A', 'B', 'C', 'D', None], dtype=object)
+    stock = {'A': 20, 'B': 0, 'C': 5, 'D': 50, None: 0}
+    item_col = items[rng.integers(0, len(items), n)]
+    df_lines = pd.DataFrame({
+        'salesid': [f'S{v:03d}' for v in rng.integers(0, 150, n)],
+        'itemid': item_col,
+        'order_date': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 30, n), unit='D'),
+        'open_qty_order': rng.integers(0, 6, n).astype(float),
+        'stock_available': [stock[item] for item in item_col],
+    })
+    df_lines.loc[rng.random(n) < 0.05, 'order_date'] = pd.NaT
+    df_po = pd.DataFrame({
+        'itemid': items[rng.integers(0, len(items), 30)],
+        'requested_receipt_date': pd.Timestamp('2025-02-01') + pd.to_timedelta(rng.permutation(30), unit='D'),
+        'po_qty': rng.integers(0, 40, 30).astype(float),
+    })
+    check(df_lines, df_po)
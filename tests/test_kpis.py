@@ -0,0 +1,23 @@
+import pandas as pd
+
+from kpis import build_kpi_tables, build_snapshot_meta, line_totals
+
+def test_meta_totals_include_lines_without_customer():
+    df = pd.DataFrame({
+        'salesid': ['SO1', 'SO1', 'SO2', 'SO3'],
+        'sales_amount': [10.0, 5.0, 20.0, 7.5],
+        'customer_name': ['Cliente A', 'Cliente A', 'Cliente B', None],
+        'cust_account_id': ['C1', 'C1', 'C2', 'C9'],
+        'sales_responsible': ['Ana', 'Ana', 'Bruno', None],
+        'customer_group': ['G1', 'G1', 'G2', None],
+        'order_date': pd.to_datetime(['2025-01-02', '2025-01-02', '2025-02-10', '2025-03-01']),
+    })
+    df_customer, df_customer_day = build_kpi_tables(df)
+    meta = build_snapshot_meta(df_customer, df_customer_day, ['sales_responsible'], totals=line_totals(df))
+
+    assert meta['line_count'] == 4
+    assert meta['total_open'] == 42.5
+    assert meta['order_count'] == 3
+    assert meta['customer_count'] == 2
+    assert meta['customers'] == ['Cliente A', 'Cliente B']
+    assert meta['portfolios'] == {'sales_responsible': ['Ana', 'Bruno']}
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import transform_data as td
+from allocation import allocate_supply
+from customer_index import build_customer_index
+from derived_columns import apply_derived_columns
+from kpis import build_kpi_tables
+from portfolio import PORTFOLIO_COLUMNS, PORTFOLIO_SORT_COLUMNS, portfolio_customers, portfolio_page
+from store import query_portfolio, write_store
+from synthetic_data import generate_sources
+
+ROW_COLUMNS = ['salesid', 'itemid', 'customer_name', 'order_date', 'sales_amount']
+
+@pytest.fixture(scope='module')
+def snapshot(tmp_path_factory):
+    frames = generate_sources(3000, seed=7)
+    frames['sales'] = frames['sales'].sample(frac=1, random_state=3).reset_index(drop=True)
+    sources = td.prepare_sources(frames['sales'], frames['picking'], frames['stock'], frames['customer'], frames['po'])
+    df = td.merge_open_lines(*sources[:4])
+    df = td.prepare_snapshot_types(apply_derived_columns(allocate_supply(df, sources[4])))
+
+    path = str(tmp_path_factory.mktemp('store') / 'open_lines.sqlite')
+    write_store(df, path)
+    df_kpi_customer, _ = build_kpi_tables(df)
+    df_kpi_customer['customer_name'] = df_kpi_customer['customer_name'].astype(str)
+    return build_customer_index(df), df_kpi_customer.set_index('customer_name'), path
+
+def rows(df):
+    return list(df[ROW_COLUMNS].astype(object).itertuples(index=False, name=None))
+
+@pytest.mark.parametrize('sort_col', list(PORTFOLIO_SORT_COLUMNS.values()))
+@pytest.mark.parametrize('ascending', [True, False])
+@pytest.mark.parametrize('by', PORTFOLIO_COLUMNS)
+def test_parquet_and_sqlite_pages_match(snapshot, sort_col, ascending, by):
+    index, df_kpi_customer, path = snapshot
+    value = df_kpi_customer[by].dropna().astype(str).iloc[0]
+    customers = portfolio_customers(df_kpi_customer, by, value)
+
+    for page, page_size in [(0, 50), (1, 50), (0, 100000)]:
+        memory, memory_total = portfolio_page(index, customers, None, None, sort_col, ascending, page, page_size)
+        sqlite, sqlite_total = query_portfolio(path, by, value, None, None, sort_col, ascending, page, page_size)
+        assert memory_total == sqlite_total
+        assert rows(memory) == rows(sqlite)
+
+def test_order_ids_sort_by_value_not_category_code(snapshot):
+    index, df_kpi_customer, _ = snapshot
+    value = df_kpi_customer['sales_responsible'].dropna().astype(str).iloc[0]
+    customers = portfolio_customers(df_kpi_customer, 'sales_responsible', value)
+    page, _ = portfolio_page(index, customers, None, None, 'salesid', True, 0, 100000)
+    ids = page['salesid'].astype(str).to_numpy()
+    assert (ids[:-1] <= ids[1:]).all()
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from profiling import RunProfiler, reset_peak_rss
+
+pytestmark = pytest.mark.skipif(not reset_peak_rss(), reason="pico de RSS por etapa só no Linux (/proc/self/clear_refs)")
+
+def test_stage_peak_is_measured_per_stage():
+    profiler = RunProfiler()
+    with profiler.stage('grande'):
+        block = np.ones(200 * 2**20 // 8)
+        del block
+    with profiler.stage('pequena'):
+        pass
+    with profiler.stage('externa'):
+        with profiler.stage('interna'):
+            block = np.ones(100 * 2**20 // 8)
+            del block
+
+    peaks = {s['stage']: s['max_rss_mb'] for s in profiler.stages}
+    assert peaks['grande'] - peaks['pequena'] > 150
+    assert peaks['externa'] >= peaks['interna'] > peaks['pequena'] + 50
+    assert profiler.report()['max_rss_mb'] >= peaks['grande']
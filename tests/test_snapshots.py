@@ -0,0 +1,56 @@
+import os
+
+from snapshots import SnapshotWatcher, new_version, publish_version, staging_dir
+
+def publish(output_dir, content):
+    version = new_version()
+    path = staging_dir(output_dir, version)
+    with open(os.path.join(path, 'data.txt'), 'w') as f:
+        f.write(content)
+    publish_version(output_dir, version, path)
+    return version
+
+def read_data(manifest):
+    with open(os.path.join('snapshots', manifest['version'], 'data.txt')) as f:
+        content = f.read()
+    if content == 'corrupt':
+        raise ValueError("arquivo corrompido")
+    return content
+
+def test_failed_version_keeps_previous_and_is_retried(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    publish('.', 'v1')
+    watcher = SnapshotWatcher('.', read_data, poll_seconds=3600)
+    assert watcher.current == 'v1'
+
+    version = publish('.', 'corrupt')
+    assert not watcher.check()
+    assert watcher.current == 'v1'
+    assert isinstance(watcher.last_error, ValueError)
+
+    with open(os.path.join('snapshots', version, 'data.txt'), 'w') as f:
+        f.write('v2')
+    assert watcher.check()
+    assert watcher.current == 'v2'
+    assert watcher.last_error is None
+
+def test_warm_failure_keeps_previous(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    publish('.', 'v1')
+    warmed = []
+
+    def warm(loaded):
+        if loaded == 'v2':
+            raise FileNotFoundError("base ausente")
+        warmed.append(loaded)
+
+    watcher = SnapshotWatcher('.', read_data, poll_seconds=3600, warm=warm)
+    assert watcher.current == 'v1' and warmed == []
+
+    publish('.', 'v2')
+    assert not watcher.check()
+    assert watcher.current == 'v1'
+
+    publish('.', 'v3')
+    assert watcher.check()
+    assert watcher.current == 'v3' and warmed == ['v3']
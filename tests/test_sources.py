@@ -0,0 +1,100 @@
+import json
+import os
+
+import pytest
+
+boto3 = pytest.importorskip('boto3')
+moto = pytest.importorskip('moto')
+from botocore.exceptions import ClientError
+
+from snapshots import MANIFEST_FILE, new_version, publish_version, staging_dir
+from sources import S3Source, upload_snapshot
+
+BUCKET = 'erp'
+PREFIX = 'exports/daily'
+FILES = {'sales': 'Sales.xlsx', 'stock': 'Stock.xlsx'}
+PART_SIZE = 1024
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.delenv('AWS_ENDPOINT_URL', raising=False)
+    with moto.mock_aws():
+        client = boto3.client('s3')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+def put(client, file_name, data):
+    client.put_object(Bucket=BUCKET, Key=f"{PREFIX}/{file_name}", Body=data)
+
+def record_gets(client):
+    """Registra cada get_object: (arquivo, faixa pedida, código de erro ou None)."""
+    calls = []
+    original = client.get_object
+
+    def get_object(**kwargs):
+        file_name = kwargs['Key'].rsplit('/', 1)[1]
+        try:
+            response = original(**kwargs)
+        except ClientError as e:
+            calls.append((file_name, kwargs.get('Range'), e.response['Error']['Code']))
+            raise
+        calls.append((file_name, kwargs.get('Range'), None))
+        return response
+
+    client.get_object = get_object
+    return calls
+
+def test_fetch_downloads_in_ranges_then_reuses_cache(s3, tmp_path):
+    contents = {name: os.urandom(PART_SIZE * 3 + 100 * i + 7) for i, name in enumerate(FILES.values())}
+    for name, data in contents.items():
+        put(s3, name, data)
+    source = S3Source(f"s3://{BUCKET}/{PREFIX}", local_dir=str(tmp_path), client=s3, part_size=PART_SIZE)
+    calls = record_gets(s3)
+
+    local_dir = source.fetch(FILES)
+    for name, data in contents.items():
+        with open(os.path.join(local_dir, name), 'rb') as f:
+            assert f.read() == data
+    assert all(sum(1 for call in calls if call[0] == name) == 4 for name in contents)
+
+    calls.clear()
+    source.fetch(FILES)
+    assert sorted(calls) == sorted((name, f"bytes=0-{PART_SIZE - 1}", '304') for name in contents)
+
+    calls.clear()
+    put(s3, 'Stock.xlsx', b'nova versao')
+    source.fetch(FILES)
+    assert sorted((name, code) for name, _, code in calls) == [('Sales.xlsx', '304'), ('Stock.xlsx', None)]
+    with open(os.path.join(local_dir, 'Stock.xlsx'), 'rb') as f:
+        assert f.read() == b'nova versao'
+
+def test_missing_object_raises_file_not_found(s3, tmp_path):
+    put(s3, 'Sales.xlsx', b'dados')
+    source = S3Source(f"s3://{BUCKET}/{PREFIX}", local_dir=str(tmp_path), client=s3, part_size=PART_SIZE)
+    with pytest.raises(FileNotFoundError):
+        source.fetch(FILES)
+
+def test_upload_snapshot_sends_manifest_last(s3, tmp_path):
+    output_dir = str(tmp_path)
+    version = new_version()
+    path = staging_dir(output_dir, version)
+    for name in ['data_costumer_care.parquet', 'data_costumer_kpis.parquet']:
+        with open(os.path.join(path, name), 'wb') as f:
+            f.write(os.urandom(PART_SIZE))
+    publish_version(output_dir, version, path)
+
+    uploaded = []
+    original = s3.upload_file
+    s3.upload_file = lambda file_name, bucket, key, **kwargs: (uploaded.append(key), original(file_name, bucket, key, **kwargs))
+
+    assert upload_snapshot('s3://erp/published', output_dir, client=s3) == version
+    assert uploaded[-1] == f"published/{MANIFEST_FILE}"
+    assert sorted(uploaded[:-1]) == [
+        f"published/snapshots/{version}/data_costumer_care.parquet",
+        f"published/snapshots/{version}/data_costumer_kpis.parquet",
+    ]
+    manifest = json.loads(s3.get_object(Bucket=BUCKET, Key=f"published/{MANIFEST_FILE}")['Body'].read())
+    assert manifest['version'] == version
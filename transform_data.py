@@ -1,163 +1,157 @@
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
 import os
 import warnings
 
+from ingest import RAW_FILES, read_raw_files
+from schemas import ACTIVE_SALES_STATUSES, TRACKED_PICKING_STATUSES, SchemaError, apply_schema
+from allocation import allocate_supply
+from derived_columns import apply_derived_columns
+from kpis import KPI_CUSTOMER_FILE, KPI_CUSTOMER_DAY_FILE, KPI_META_FILE, build_kpi_tables, build_snapshot_meta, line_totals
+from portfolio import PORTFOLIO_COLUMNS
+from profiling import RunProfiler
+from snapshots import new_version, publish_version, staging_dir, write_json_atomic
+from sources import open_source, upload_snapshot
+from store import STORE_FILE, write_store
+from incremental import STATE_DIR_NAME, SALES_KEYS, compute_fingerprints, changed_keys, key_mask, load_state, save_state
+
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
 RAW_DATA_PATH = "data_raw"
 TRANSFORMED_DATA_PATH = "data_transformed"
-OUTPUT_FILE = "data_costumer_care.xlsx"
-ACTIVE_SALES_STATUSES = ['OPEN ORDER'] 
-TRACKED_PICKING_STATUSES = ['ACTIVATED', 'COMPLETED'] 
+OUTPUT_FILE = "data_costumer_care.parquet"
+RUN_REPORT_FILE = "run_report.json"
+EXCEL_EXPORT_FILE = "data_costumer_care.xlsx"
 COVERAGE_STATUS = 'AVAILABLE'
+KEY_COLUMNS = ['salesid', 'itemid', 'cust_account_id']
+CATEGORY_COLUMNS = ['sales_status', 'picking_status', 'coverage_status', 'customer_group', 'sales_responsible', 'customer_name', 'status_logistica', 'status_cobertura']
+
+def prepare_snapshot_types(df):
+    """Garante os tipos finais da base para que o dashboard leia o snapshot sem reconverter colunas."""
+    for col in ['order_date', 'picking_date', 'Data prevista para fatura']:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce', format='mixed')
+
+    if 'sales_amount' in df.columns:
+        df['sales_amount'] = pd.to_numeric(df['sales_amount'], errors='coerce').fillna(0)
+
+    if 'customer_name' in df.columns:
+        df['customer_name'] = df['customer_name'].astype(str).str.strip()
+
+    for col in KEY_COLUMNS + CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    for col in [col for col in df.columns if df[col].dtype == object]:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+
+    return df
+
+def clean_merge_keys(df, cols):
+    for col in cols:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip().str.upper()
+    return df
+
+def intern_merge_keys(frames, cols=KEY_COLUMNS):
+    """Converte cada chave de merge para um dicionário categórico único, compartilhado por todas as bases.
+
+    Com o mesmo dtype categórico dos dois lados, os merges comparam códigos inteiros em vez de strings.
+    """
+    for col in cols:
+        present = [df for df in frames if col in df.columns]
+        if not present:
+            continue
+        categories = pd.concat([pd.Series(df[col].unique()) for df in present]).dropna().unique()
+        key_dtype = pd.CategoricalDtype(categories=categories)
+        for df in present:
+            df[col] = df[col].astype(key_dtype)
+    return frames
+
+def prepare_sources(df_sales, df_picking, df_stock, df_customer, df_po):
+    """Aplica os esquemas (schemas.SCHEMAS), limpa e filtra as bases de origem. Retorna None se faltar coluna essencial."""
 
-def transform_data():
-    
-    print("-" * 50)
-    print("Iniciando Transformação de Dados...")
-    print("Carregando arquivos de origem...")
+    print("Pré-processando e garantindo tipos de dados...")
 
     try:
-        df_sales = pd.read_excel(os.path.join(RAW_DATA_PATH, "CHINTSalesDetail.xlsx"))
-        df_picking = pd.read_excel(os.path.join(RAW_DATA_PATH, "SalesPickingList.xlsx"))
-        df_stock = pd.read_excel(os.path.join(RAW_DATA_PATH, "OnHandInventory.xlsx"))
-        df_customer = pd.read_excel(os.path.join(RAW_DATA_PATH, "AllCostumers.xlsx"))
-        df_po = pd.read_excel(os.path.join(RAW_DATA_PATH, "OpenPurchaseOrderLines.xlsx"))
-
-    except FileNotFoundError as e:
-        print(f"Erro: arquivo não encontrado: {e.filename}. Verifique a pasta '{RAW_DATA_PATH}'.")
-        return
-    except Exception as e:
-        print(f"Erro ao ler arquivos: {e}")
-        return
-
-    print("Pré-processando e garantindo tipos de dados...")
+        df_sales = apply_schema('sales', df_sales)
+        df_picking = apply_schema('picking', df_picking)
+        df_stock = apply_schema('stock', df_stock)
+        df_customer = apply_schema('customer', df_customer)
+        df_po = apply_schema('po', df_po)
+    except SchemaError as e:
+        print(f"ERRO CRÍTICO DE COLUNA: {e}")
+        print("Por favor, verifique se os nomes das colunas estão EXATAMENTE corretos (incluindo Capitalização).")
+        return None
 
-    def clean_merge_keys(df, cols):
-        for col in cols:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.strip().str.upper()
-        return df
-    
-   
-    sales_cols_map = {
-        'SalesId': 'salesid',
-        'Item Id': 'itemid',
-        'Cust Account': 'cust_account_id',
-        'Sales Amount': 'sales_amount',
-        'Open Qty': 'open_qty_order',
-        'Create Date': 'order_date'
-    }
-    
-    df_sales = df_sales.rename(columns={k: v for k, v in sales_cols_map.items() if k in df_sales.columns})
     df_sales = clean_merge_keys(df_sales, ['salesid', 'itemid', 'cust_account_id'])
-
-    if 'salesid' not in df_sales.columns or 'itemid' not in df_sales.columns:
-        print(f"ERRO CRÍTICO DE CHAVE DE MERGE: As colunas 'salesid' (esperada de 'SalesId') ou 'itemid' (esperada de 'Item Id') não foram encontradas em 'CHINTSalesDetail.xlsx'.")
-        print(f"Colunas disponíveis em df_sales: {df_sales.columns.tolist()}")
-        return
-
-    if 'Sales Status' in df_sales.columns:
-        df_sales = df_sales.rename(columns={'Sales Status': 'sales_status'})
-    elif 'Status Venda' in df_sales.columns:
-         df_sales = df_sales.rename(columns={'Status Venda': 'sales_status'})
-    
-    if 'sales_status' not in df_sales.columns:
-        print(f"ERRO CRÍTICO DE COLUNA: Não foi possível encontrar 'sales_status' em 'CHINTSalesDetail.xlsx'.")
-        print(f"Colunas disponíveis: {df_sales.columns.tolist()}")
-        return
-
     df_sales['sales_status'] = df_sales['sales_status'].astype(str).str.strip().str.upper()
 
-    picking_cols_map = {
-        'Number': 'salesid',
-        'Item number': 'itemid',
-        'Route': 'picking_route',                 
-        'Handling status': 'picking_status',      
-        'Created date and time': 'picking_date',  
-        'Quantity': 'picking_qty',                
-    }
-    
-    df_picking = df_picking.rename(columns={k: v for k, v in picking_cols_map.items() if k in df_picking.columns})
     df_picking = clean_merge_keys(df_picking, ['salesid', 'itemid'])
-    
-    if 'salesid' not in df_picking.columns or 'itemid' not in df_picking.columns:
-        print(f"ERRO CRÍTICO DE CHAVE DE MERGE: As colunas 'salesid' (esperada de 'Number') ou 'itemid' não foram encontradas em 'SalesPickingList.xlsx'.")
-        print(f"Colunas disponíveis em df_picking: {df_picking.columns.tolist()}")
-        return
-
-    required_picking_cols = ['picking_status', 'picking_route', 'picking_qty', 'picking_date', 'salesid', 'itemid']
-    missing_picking_cols = [col for col in required_picking_cols if col not in df_picking.columns]
+    df_picking['picking_status'] = df_picking['picking_status'].astype(str).str.strip().str.upper()
 
-    if missing_picking_cols:
-        print(f"ERRO CRÍTICO DE COLUNA: Ainda faltam colunas essenciais no Picking List ('SalesPickingList.xlsx'): {missing_picking_cols}")
-        print("Por favor, verifique se os nomes das colunas estão EXATAMENTE corretos (incluindo Capitalização).")
-        return
-
-    if 'picking_status' in df_picking.columns:
-        df_picking['picking_status'] = df_picking['picking_status'].astype(str).str.strip().str.upper()
-    else:
-        df_picking['picking_status'] = pd.NA
-
-    stock_cols_map = {
-        'Item number': 'itemid', 
-    }
-    df_stock = df_stock.rename(columns={k: v for k, v in stock_cols_map.items() if k in df_stock.columns})
     df_stock = clean_merge_keys(df_stock, ['itemid'])
-    
-    if 'Total available' in df_stock.columns:
-        df_stock = df_stock.rename(columns={'Total available': 'stock_available'})
-    elif 'Total available' not in df_stock.columns and 'stock_available' not in df_stock.columns:
-        df_stock = df_stock.rename(columns={'Quantity': 'stock_available'})
-
-    customer_cols_map = {
-        'Account': 'cust_account_id',
-        'Name': 'customer_name',
-        'Customer group': 'customer_group',
-    }
-    df_customer = df_customer.rename(columns={k: v for k, v in customer_cols_map.items() if k in df_customer.columns})
     df_customer = clean_merge_keys(df_customer, ['cust_account_id'])
-    
-    if 'Employee responsible' in df_customer.columns:
-        df_customer = df_customer.rename(columns={'Employee responsible': 'sales_responsible'})
-
-    po_cols_map = {
-        'Item number': 'itemid',
-        'Requested receipt date': 'requested_receipt_date'
-    }
-
-    if 'Item number' in df_po.columns or 'itemid' in df_po.columns:
-        df_po = df_po.rename(columns={k: v for k, v in po_cols_map.items() if k in df_po.columns})
-        df_po = clean_merge_keys(df_po, ['itemid'])
-    else:
-        print("Aviso: Não foi possível encontrar a coluna de item (Item number/itemid) em OpenPurchaseOrderLines. A importação será ignorada.")
-        df_po = pd.DataFrame(columns=['itemid', 'requested_receipt_date', 'Quantity'])
+    df_po = clean_merge_keys(df_po, ['itemid'])
 
     print(f"Filtrando linhas ativas ({', '.join(ACTIVE_SALES_STATUSES)})...")
     df_filtered = df_sales[df_sales['sales_status'].isin(ACTIVE_SALES_STATUSES)].copy()
     
     if df_filtered.empty:
         print("Aviso: Nenhum registro de vendas ativo encontrado após a filtragem inicial.")
-        return
-
-    print(f"Realizando merge com Picking List (status {', '.join(TRACKED_PICKING_STATUSES)})...")
+        return None
 
     df_picking_tracked = df_picking[df_picking['picking_status'].isin(TRACKED_PICKING_STATUSES)].copy()
     
-    picking_cols = [col for col in ['salesid', 'itemid', 'picking_route', 'picking_status', 'picking_qty', 'picking_date'] if col in df_picking_tracked.columns]
-    
-    df_picking_tracked = df_picking_tracked[picking_cols]
-    
-    df_merged = pd.merge(
-        df_filtered, 
-        df_picking_tracked, 
-        on=['salesid', 'itemid'], 
-        how='left', 
-        suffixes=('_order', '_picking')
-    )
+    df_picking_tracked = df_picking_tracked[['salesid', 'itemid', 'picking_route', 'picking_status', 'picking_qty', 'picking_date']]
+
+    return tuple(intern_merge_keys([df_filtered, df_picking_tracked, df_stock, df_customer, df_po]))
+
+def merge_many_to_one(df_left, df_right, on, label):
+    """Merge left que mantém exatamente uma linha por linha da esquerda.
+
+    Chaves repetidas na base da direita multiplicariam as linhas de venda (e o valor em aberto);
+    elas são reportadas e só a primeira ocorrência é usada. O validate do pandas garante o resto.
+    """
+    duplicated = df_right.duplicated(subset=on, keep='first')
+    if duplicated.any():
+        print(f"Aviso: {label}: {int(duplicated.sum())} linha(s) com chave repetida ({', '.join(on)}) "
+              f"ignoradas para não duplicar linhas de venda.")
+        df_right = df_right[~duplicated]
+
+    return pd.merge(df_left, df_right, on=on, how='left', validate='many_to_one')
+
+def aggregate_picking(df_picking_tracked):
+    """Uma linha por (salesid, itemid): status mais recente, quantidade somada, primeira rota e data."""
+    df_sorted = df_picking_tracked.sort_values('picking_date', kind='stable')
+    return df_sorted.groupby(['salesid', 'itemid'], observed=True, sort=False).agg(
+        picking_route=('picking_route', 'first'),
+        picking_status=('picking_status', 'last'),
+        picking_qty=('picking_qty', 'sum'),
+        picking_date=('picking_date', 'first'),
+    ).reset_index()
+
+def aggregate_stock(df_stock):
+    """Uma linha por item: disponibilidade somada entre depósitos."""
+    aggregations = {}
+    if 'stock_available' in df_stock.columns:
+        aggregations['stock_available'] = ('stock_available', 'sum')
+    if 'coverage_status_stock' in df_stock.columns:
+        aggregations['coverage_status_stock'] = ('coverage_status_stock', 'first')
+    if not aggregations:
+        return df_stock[['itemid']].drop_duplicates()
+    return df_stock.groupby('itemid', observed=True, sort=False).agg(**aggregations).reset_index()
+
+def merge_picking(df_filtered, df_picking_tracked):
+    print(f"Realizando merge com Picking List (status {', '.join(TRACKED_PICKING_STATUSES)})...")
+
+    df_merged = merge_many_to_one(df_filtered, aggregate_picking(df_picking_tracked), ['salesid', 'itemid'], 'Picking List')
+
+    if 'picking_status' not in df_merged.columns:
+        df_merged['picking_status'] = pd.NA
+
+    return df_merged
 
+def merge_stock(df_merged, df_stock):
     print("Adicionando informações de Estoque...")
 
     df_stock_filtered = df_stock.rename(columns={'coverage_status': 'coverage_status_stock'})
@@ -171,14 +165,9 @@ def transform_data():
     if 'itemid' not in df_stock_filtered.columns:
         df_stock_filtered = df_stock_filtered.assign(itemid=pd.NA)
 
-    df_stock_filtered = df_stock_filtered[cols_to_select]
+    df_stock_filtered = aggregate_stock(df_stock_filtered[cols_to_select])
 
-    df_merged = pd.merge(
-        df_merged, 
-        df_stock_filtered, 
-        on='itemid', 
-        how='left'
-    )
+    df_merged = merge_many_to_one(df_merged, df_stock_filtered, ['itemid'], 'Estoque')
     
     if 'stock_available' in df_merged.columns:
         df_merged['stock_available'] = df_merged['stock_available'].fillna(0)
@@ -191,76 +180,226 @@ def transform_data():
     else:
         df_merged['coverage_status'] = 'NO COVERAGE'
 
+    return df_merged
+
+def merge_customer(df_merged, df_customer):
     print("Adicionando dados do Cliente (Nome, Vendedor/Grupo)...")
     
     df_customer_filtered = df_customer[['cust_account_id', 'customer_name', 'sales_responsible', 'customer_group']]
 
-    df_merged = pd.merge(
-        df_merged, 
-        df_customer_filtered, 
-        on='cust_account_id', 
-        how='left'
+    df_merged = merge_many_to_one(df_merged, df_customer_filtered, ['cust_account_id'], 'Clientes')
+
+    return df_merged
+
+def merge_open_lines(df_filtered, df_picking_tracked, df_stock, df_customer, profiler=None):
+    """Cruza as linhas abertas com picking, estoque e cliente (antes da alocação e das colunas derivadas)."""
+    profiler = profiler or RunProfiler()
+    df_merged = df_filtered
+    for name, merge_fn, df_right in [
+        ('merge_picking', merge_picking, df_picking_tracked),
+        ('merge_stock', merge_stock, df_stock),
+        ('merge_customer', merge_customer, df_customer),
+    ]:
+        with profiler.stage(name, rows_in=len(df_merged)) as stage:
+            df_merged = merge_fn(df_merged, df_right)
+            stage['rows_out'] = len(df_merged)
+    return df_merged
+
+def write_snapshot(df_merged, output_dir, export_excel=False, sqlite_store=False):
+    """Publica uma nova versão do snapshot (Parquet, tabelas de KPI, resumo JSON e, se pedido, a base SQLite).
+
+    A versão é gravada em uma pasta de preparo e publicada com rename + manifest.json
+    (ver snapshots.py); a exportação Excel, se pedida, fica fora das versões, em `output_dir`.
+    Retorna o caminho do snapshot Parquet publicado.
+    """
+    version = new_version()
+    staging_path = staging_dir(output_dir, version)
+
+    df_merged.to_parquet(os.path.join(staging_path, OUTPUT_FILE), index=False)
+
+    df_kpi_customer, df_kpi_customer_day = build_kpi_tables(df_merged)
+    df_kpi_customer.to_parquet(os.path.join(staging_path, KPI_CUSTOMER_FILE), index=False)
+    df_kpi_customer_day.to_parquet(os.path.join(staging_path, KPI_CUSTOMER_DAY_FILE), index=False)
+    meta = build_snapshot_meta(df_kpi_customer, df_kpi_customer_day, PORTFOLIO_COLUMNS, totals=line_totals(df_merged))
+    write_json_atomic(os.path.join(staging_path, KPI_META_FILE), meta)
+
+    if sqlite_store:
+        write_store(df_merged, os.path.join(staging_path, STORE_FILE))
+
+    published_dir = publish_version(output_dir, version, staging_path, rows=len(df_merged))
+    print(f"Versão {version} do snapshot publicada em '{published_dir}'.")
+
+    if export_excel:
+        excel_path = os.path.join(output_dir, EXCEL_EXPORT_FILE)
+        df_merged.to_excel(excel_path, index=False)
+        print(f"Exportação Excel salva em '{excel_path}'.")
+
+    return os.path.join(published_dir, OUTPUT_FILE)
+
+def merge_incremental(df_previous, previous_fps, current_fps, sources, profiler=None):
+    """Reaproveita a base anterior e refaz o merge só das linhas novas, alteradas ou afetadas por estoque/cliente.
+
+    A base guardada fica antes da alocação: estoque e POs são realocados sobre todas as linhas a cada execução.
+    """
+    df_filtered, df_picking_tracked, df_stock, df_customer, df_po = sources
+
+    sales_keys = pd.concat([
+        changed_keys(previous_fps['sales'], current_fps['sales'], SALES_KEYS),
+        changed_keys(previous_fps['picking'], current_fps['picking'], SALES_KEYS),
+    ], ignore_index=True)
+    items = changed_keys(previous_fps['stock'], current_fps['stock'], ['itemid'])['itemid']
+    accounts = changed_keys(previous_fps['customer'], current_fps['customer'], ['cust_account_id'])['cust_account_id']
+
+    stale = (
+        key_mask(df_previous, sales_keys, SALES_KEYS)
+        | df_previous['itemid'].isin(items)
+        | df_previous['cust_account_id'].isin(accounts)
     )
-    
-    print("Adicionando previsão de chegada de Importação (PO)...")
+    affected = (
+        key_mask(df_filtered, sales_keys, SALES_KEYS)
+        | df_filtered['itemid'].isin(items)
+        | df_filtered['cust_account_id'].isin(accounts)
+    )
+
+    print(f"Modo incremental: {int(stale.sum())} linha(s) anteriores descartadas, {int(affected.sum())} linha(s) abertas reprocessadas "
+          f"({len(items.unique())} item(ns) com estoque alterado).")
+
+    df_kept = df_previous[~stale]
+    if not affected.any():
+        return df_kept.reset_index(drop=True)
+
+    df_delta = merge_open_lines(df_filtered[affected], df_picking_tracked, df_stock, df_customer, profiler=profiler)
+
+    if set(df_delta.columns) != set(df_previous.columns):
+        print("Aviso: colunas da base mudaram desde a última execução; refazendo a transformação completa.")
+        return merge_open_lines(*sources[:4], profiler=profiler)
+
+    return pd.concat([df_kept, df_delta[df_previous.columns]], ignore_index=True)
+
+def run_transform(profiler, export_excel=False, incremental=False, sqlite_store=False, source=None, upload_to=None, endpoint_url=None):
+    """Executa as etapas da transformação registrando cada uma no profiler. Retorna o caminho do snapshot ou None.
 
-    df_po_filtered = df_po.dropna(subset=['requested_receipt_date']).copy()
+    `source`: pasta local ou 's3://bucket/prefixo' com as planilhas (padrão: RAW_DATA_PATH).
+    `upload_to`: 's3://bucket/prefixo' para onde enviar a versão publicada do snapshot.
+    """
+    source = open_source(source or RAW_DATA_PATH, endpoint_url=endpoint_url)
     
-    if not df_po_filtered.empty:
-        df_po_filtered['requested_receipt_date'] = pd.to_datetime(df_po_filtered['requested_receipt_date'], errors='coerce')
-        
-        df_po_grouped = df_po_filtered.groupby('itemid')['requested_receipt_date'].min().reset_index()
-        df_po_grouped.rename(columns={'requested_receipt_date': 'Chegada Importação'}, inplace=True)
-        
-        df_merged = pd.merge(
-            df_merged, 
-            df_po_grouped, 
-            on='itemid', 
-            how='left'
-        )
+    print("-" * 50)
+    print("Iniciando Transformação de Dados...")
+    print(f"Carregando arquivos de origem de '{source}'...")
+
+    try:
+        with profiler.stage('fetch'):
+            raw_path = source.fetch(RAW_FILES)
+
+        with profiler.stage('read') as stage:
+            raw = read_raw_files(raw_path)
+            stage['rows_out'] = sum(len(df) for df in raw.values())
+            stage['rows_by_file'] = {name: len(df) for name, df in raw.items()}
+        df_sales = raw['sales']
+        df_picking = raw['picking']
+        df_stock = raw['stock']
+        df_customer = raw['customer']
+        df_po = raw['po']
+
+    except FileNotFoundError as e:
+        print(f"Erro: arquivo não encontrado: {e.filename}. Verifique a origem '{source}'.")
+        return None
+    except SchemaError as e:
+        print(f"ERRO CRÍTICO DE COLUNA: {e}")
+        return None
+    except Exception as e:
+        print(f"Erro ao ler arquivos: {e}")
+        return None
+
+    with profiler.stage('prepare_sources', rows_in=len(df_sales)) as stage:
+        sources = prepare_sources(df_sales, df_picking, df_stock, df_customer, df_po)
+        stage['rows_out'] = len(sources[0]) if sources is not None else 0
+    if sources is None:
+        return None
+
+    current_fps = compute_fingerprints(dict(zip(['sales', 'picking', 'stock', 'customer', 'po'], sources)))
+    state_dir = os.path.join(TRANSFORMED_DATA_PATH, STATE_DIR_NAME)
+    state = load_state(state_dir) if incremental else None
+
+    if incremental and state is None:
+        print("Aviso: nenhum estado anterior encontrado; executando a transformação completa.")
+
+    if state is None:
+        df_merged = merge_open_lines(*sources[:4], profiler=profiler)
     else:
-        df_merged['Chegada Importação'] = pd.NaT
+        with profiler.stage('merge_incremental', rows_in=len(state[0])) as stage:
+            df_merged = merge_incremental(state[0], state[1], current_fps, sources, profiler=profiler)
+            stage['rows_out'] = len(df_merged)
 
-    print("Calculando status logístico e datas de faturamento...")
+    with profiler.stage('save_state', rows_in=len(df_merged)):
+        save_state(state_dir, df_merged, current_fps)
 
-    if 'picking_status' not in df_merged.columns:
-        df_merged['picking_status'] = pd.NA
+    print("Alocando estoque e POs às linhas em aberto (FIFO por data da ordem)...")
 
-    df_merged['status_logistica'] = df_merged.apply(
-        lambda row: 'Em Picking (ATIVO)' if row['picking_status'] == 'ACTIVATED'
-        else ('Picking Concluído' if row['picking_status'] == 'COMPLETED' else row['sales_status']), 
-        axis=1
-    )
-    
-    hoje = datetime.now()
-    data_120_dias = (hoje.replace(day=1) + timedelta(days=120)).replace(day=1)
+    with profiler.stage('allocation', rows_in=len(df_merged)) as stage:
+        df_merged = allocate_supply(df_merged, sources[4])
+        stage['rows_out'] = len(df_merged)
 
-    def calcular_data_fatura(row):
-        data_chegada = row['Chegada Importação']
+    print("Calculando status logístico e datas de faturamento...")
 
-        if pd.notna(data_chegada) and data_chegada != 'Sem Cobertura':
-            try:
-                return pd.to_datetime(data_chegada, errors='coerce') + timedelta(days=4)
-            except:
-                return data_120_dias
-        else:
-            return data_120_dias
+    with profiler.stage('derived_columns', rows_in=len(df_merged)) as stage:
+        df_merged = apply_derived_columns(df_merged)
+        stage['rows_out'] = len(df_merged)
 
-    df_merged['Data prevista para fatura'] = df_merged.apply(calcular_data_fatura, axis=1)
+    with profiler.stage('write', rows_in=len(df_merged)) as stage:
+        df_merged = prepare_snapshot_types(df_merged)
+        output_path = write_snapshot(df_merged, TRANSFORMED_DATA_PATH, export_excel=export_excel, sqlite_store=sqlite_store)
+        stage['rows_out'] = len(df_merged)
+
+    if upload_to:
+        with profiler.stage('upload') as stage:
+            try:
+                upload_snapshot(upload_to, TRANSFORMED_DATA_PATH, endpoint_url=endpoint_url)
+            except Exception as e:
+                stage['error'] = str(e)
+                print(f"Erro ao enviar o snapshot para '{upload_to}': {e}. A versão local continua publicada.")
 
-    df_merged['Chegada Importação'] = df_merged['Chegada Importação'].apply(
-        lambda x: x.strftime('%d/%m/%Y') if pd.notna(x) and isinstance(x, (datetime, pd.Timestamp)) else 'Sem Cobertura'
-    )
-    
-    if not os.path.exists(TRANSFORMED_DATA_PATH):
-        os.makedirs(TRANSFORMED_DATA_PATH)
-        
-    output_path = os.path.join(TRANSFORMED_DATA_PATH, OUTPUT_FILE)
-    df_merged.to_excel(output_path, index=False)
-    
     print(f"Transformação concluída! Arquivo salvo em '{output_path}'.")
     print(f"Total de linhas na base final: {len(df_merged)}")
+    profiler.print_summary()
     print("-" * 50)
+    return output_path
+
+def transform_data(export_excel=False, incremental=False, sqlite_store=False, source=None, upload_to=None, endpoint_url=None):
+    profiler = RunProfiler()
+    output_path = None
+    try:
+        output_path = run_transform(
+            profiler, export_excel=export_excel, incremental=incremental, sqlite_store=sqlite_store,
+            source=source, upload_to=upload_to, endpoint_url=endpoint_url,
+        )
+    finally:
+        report_path = os.path.join(TRANSFORMED_DATA_PATH, RUN_REPORT_FILE)
+        profiler.write_report(
+            report_path,
+            status='ok' if output_path else 'erro',
+            mode='incremental' if incremental else 'completo',
+            snapshot=output_path,
+        )
+    return output_path
     
 if __name__ == "__main__":
-    transform_data()
+    import argparse
+    parser = argparse.ArgumentParser(description="Gera o snapshot de linhas em aberto a partir das planilhas do ERP.")
+    parser.add_argument('--excel', action='store_true', help="também exporta a base em .xlsx")
+    parser.add_argument('--incremental', action='store_true', help="refaz só as linhas afetadas desde a última execução")
+    parser.add_argument('--sqlite', action='store_true', help="também grava a base SQLite usada pelo backend 'sqlite' do dashboard")
+    parser.add_argument('--source', default=RAW_DATA_PATH, help="pasta local ou s3://bucket/prefixo com as planilhas")
+    parser.add_argument('--upload-to', default=None, help="s3://bucket/prefixo para enviar a versão publicada")
+    parser.add_argument('--endpoint-url', default=None, help="endpoint S3 alternativo (MinIO, moto)")
+    args = parser.parse_args()
+
+    transform_data(
+        export_excel=args.excel,
+        incremental=args.incremental,
+        sqlite_store=args.sqlite,
+        source=args.source,
+        upload_to=args.upload_to,
+        endpoint_url=args.endpoint_url,
+    )